@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+from config.config import OUTPUT_PATH3
+from src.data_loader import load_data
+from src.data_cleaner import clean_data, handle_missing_values
+from src.feature_engineer import engineer_features, select_pca_features
+from src.pca_analyzer import perform_pca
+from src.similarity_search import build_similarity_index, similar_to_listings
+from src.text_features import hash_text_features, fit_text_price_model
+from src.memory import set_low_memory, low_memory_enabled, measure_peak_memory
+
+def time_call(func, *args, repeats=3, **kwargs):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+def benchmark_similarity_search(df_featured, principal_df, n_queries=1000, k=10, seed=42):
+    print("\n=== BENCHMARK: COMPARABLE LISTINGS SEARCH ===")
+    rng = np.random.default_rng(seed)
+    query_index = principal_df.index[rng.choice(len(principal_df), min(n_queries, len(principal_df)), replace=False)]
+
+    exact_index, exact_build = time_call(build_similarity_index, principal_df, df_featured, repeats=1)
+    approx_index, approx_build = time_call(build_similarity_index, principal_df, df_featured,
+                                           approximate=True, repeats=1)
+
+    exact_results, exact_time = time_call(similar_to_listings, exact_index, query_index, k=k)
+    approx_results, approx_time = time_call(similar_to_listings, approx_index, query_index, k=k)
+
+    exact_sets = exact_results.groupby('query')['listing_index'].apply(set)
+    approx_sets = approx_results.groupby('query')['listing_index'].apply(set).reindex(exact_sets.index)
+    recall = np.mean([len(e & a) / len(e) if isinstance(a, set) else 0.0
+                      for e, a in zip(exact_sets, approx_sets)])
+
+    results = {
+        'n_listings': len(principal_df),
+        'n_queries': len(query_index),
+        'exact_build_s': exact_build,
+        'approx_build_s': approx_build,
+        'exact_ms_per_query': exact_time / len(query_index) * 1000,
+        'approx_ms_per_query': approx_time / len(query_index) * 1000,
+        f'approx_recall_at_{k}': recall
+    }
+    for name, value in results.items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+    return results
+
+def benchmark_text_features(df):
+    print("\n=== BENCHMARK: HASHED TEXT FEATURES ===")
+    text_matrix, hash_time = time_call(hash_text_features, df, repeats=1)
+
+    base_features = [col for col in ['accommodates', 'bedrooms', 'bathrooms', 'beds', 'minimum_nights',
+                                     'availability_30', 'amenities_count', 'number_of_reviews',
+                                     'review_scores_rating'] if col in df.columns]
+    y = np.log(df['price'])
+    valid = (df[base_features].notna().all(axis=1) & np.isfinite(y)).to_numpy()
+    text_results, fit_time = time_call(fit_text_price_model, df.loc[valid, base_features], y[valid],
+                                       text_matrix[valid], repeats=1)
+
+    results = {
+        'n_documents': len(df),
+        'docs_per_second': len(df) / hash_time,
+        'nnz_per_document': text_matrix.nnz / max(len(df), 1),
+        'fit_s': fit_time,
+        'holdout_r2_base': text_results['holdout_r2_base'],
+        'holdout_r2_text': text_results['holdout_r2_text'],
+        'r2_lift': text_results['r2_lift']
+    }
+    for name, value in results.items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+    return results
+
+IMPORT_TARGETS = {
+    'data_cleaning_pipeline': 'import data_cleaning_pipeline',
+    'pca_analysis_pipeline': 'import pca_analysis_pipeline',
+    'price_analysis': ("import price_analysis_pipeline.main_price_analysis as m; "
+                       "[m.load_analysis_module(f) for f in ['1_neighborhood_analysis.py', "
+                       "'2_amenity_premium_analysis.py', '3_host_behavior_analysis.py', '4_integrated_model.py']]")
+}
+
+def benchmark_import_times(targets=IMPORT_TARGETS, repeats=3):
+    print("\n=== BENCHMARK: COLD-START IMPORT TIME ===")
+    root = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, statement in targets.items():
+        # A fresh interpreter per run, so nothing is already in sys.modules
+        code = (f"import os, sys, time; start = time.perf_counter(); {statement}; "
+                f"elapsed = time.perf_counter() - start; "
+                f"from src.lazy_imports import loaded_heavy_modules; "
+                f"print(elapsed, ','.join(loaded_heavy_modules()))")
+        timings = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True,
+                                    text=True, check=True).stdout.strip().splitlines()[-1]
+            elapsed, _, heavy = output.partition(' ')
+            timings.append(float(elapsed))
+        results[f'{name}_import_s'] = min(timings)
+        results[f'{name}_heavy_modules'] = heavy or 'none'
+    for name, value in results.items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+    return results
+
+def _memory_stages(df, results_dir):
+    from price_analysis_pipeline.main_price_analysis import load_analysis_module
+
+    neighborhood_module = load_analysis_module('1_neighborhood_analysis.py')
+    host_module = load_analysis_module('3_host_behavior_analysis.py')
+    outputs, peaks = {}, {}
+    outputs['clean'], peaks['clean'], _ = measure_peak_memory(clean_data, df)
+    outputs['missing'], peaks['missing'], _ = measure_peak_memory(handle_missing_values, outputs['clean'])
+    outputs['features'], peaks['features'], _ = measure_peak_memory(engineer_features, outputs['missing'],
+                                                                    spatial_features=False)
+    (outputs['neighborhood'], _), peaks['neighborhood'], _ = measure_peak_memory(
+        neighborhood_module.analyze_neighborhood_effects, df, results_dir=results_dir)
+    host_results, peaks['host'], _ = measure_peak_memory(host_module.analyze_host_behavior, df.copy(),
+                                                         results_dir=results_dir)
+    outputs['host'] = host_results['grouped_price_tests']
+    return outputs, peaks
+
+def benchmark_memory(df):
+    print("\n=== BENCHMARK: PEAK MEMORY PER STAGE (DEFAULT VS LOW-MEMORY) ===")
+    original_mode = low_memory_enabled()
+    snapshot = df.copy()
+    runs = {}
+    with tempfile.TemporaryDirectory() as results_dir:
+        for subdir in ['neighborhood_effects', 'host_behavior']:
+            os.makedirs(os.path.join(results_dir, subdir))
+        for mode in [False, True]:
+            set_low_memory(mode)
+            runs[mode] = _memory_stages(df, results_dir)
+    set_low_memory(original_mode)
+
+    # Same outputs in both modes, and the input frame is never written through a shallow copy.
+    # host_experience_years is relative to "now", hence the tolerance rather than exact equality.
+    identical = True
+    for stage, default_output in runs[False][0].items():
+        try:
+            pd.testing.assert_frame_equal(default_output, runs[True][0][stage], check_exact=False)
+        except AssertionError:
+            identical = False
+            print(f"  output of {stage} differs between modes")
+    input_unchanged = df.equals(snapshot)
+
+    results = {}
+    for stage in runs[False][1]:
+        results[f'{stage}_peak_mb'] = runs[False][1][stage] / 1e6
+        results[f'{stage}_peak_mb_low_memory'] = runs[True][1][stage] / 1e6
+    results['outputs_identical'] = identical
+    results['input_unchanged'] = input_unchanged
+    for name, value in results.items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+    return results
+
+def run_benchmark_suite(file_path=OUTPUT_PATH3):
+    print("Starting LA Airbnb Benchmark Suite\n")
+
+    df = load_data(file_path)
+    if df is None:
+        return None
+
+    df_featured = engineer_features(df)
+    pca_data, _ = select_pca_features(df_featured)
+    # The benchmark must not write or reuse the pipeline's cached column schema
+    _, principal_df, _, _, _ = perform_pca(pca_data, schema_path=None)
+
+    results = {
+        'import_times': benchmark_import_times(),
+        'similarity_search': benchmark_similarity_search(df_featured, principal_df),
+        'text_features': benchmark_text_features(df),
+        'memory': benchmark_memory(df)
+    }
+
+    print("\n" + "="*50)
+    print("BENCHMARK SUMMARY")
+    print("="*50)
+    for name, benchmark_results in results.items():
+        print(f"\n{name}:")
+        print(pd.Series(benchmark_results).to_string())
+    return results
+
+if __name__ == "__main__":
+    results = run_benchmark_suite()
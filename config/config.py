@@ -1,10 +1,96 @@
+import os
+
+# Outputs live in the repository, wherever the scripts are run from
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCESSED_DIR = os.path.join(REPO_DIR, 'Dataset Processed')
+
 DATA_PATH = r'C:\NU MSAI Fall 2025\Intro to DS Dataset\listings.csv'
-OUTPUT_PATH = 'Dataset Processed/la_airbnb_processed_with_pca.csv'
-PCA_COMPONENTS_PATH = 'Dataset Processed/la_airbnb_pca_components.csv'
-OUTPUT_PATH2 = 'Dataset Processed/la_airbnb_cleaned.csv'
-OUTPUT_PATH3 = 'Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv'
+CALENDAR_PATH = r'C:\NU MSAI Fall 2025\Intro to DS Dataset\calendar.csv'
+REVIEWS_PATH = r'C:\NU MSAI Fall 2025\Intro to DS Dataset\reviews.csv'
+OUTPUT_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_processed_with_pca.csv')
+PCA_COMPONENTS_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_pca_components.csv')
+OUTPUT_PATH2 = os.path.join(PROCESSED_DIR, 'la_airbnb_cleaned.csv')
+OUTPUT_PATH3 = os.path.join(PROCESSED_DIR, 'la_airbnb_cleaned_and_missing_values_handled.csv')
+PCA_MODEL_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_pca_model.joblib')
+SEGMENT_MODEL_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_segment_model.joblib')
+COLUMN_SCHEMA_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_pca_column_schema.json')
+SHARED_MATRIX_DIR = os.path.join(PROCESSED_DIR, 'shared_design_matrix')
+CALENDAR_FEATURES_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_calendar_features.csv')
+REVIEWS_STATE_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_review_series.npz')
+REVIEWS_FEATURES_PATH = os.path.join(PROCESSED_DIR, 'la_airbnb_review_features.csv')
+# Earlier listings snapshots as (date, path) pairs, oldest first, e.g. ('2025-01-15', r'...\listings_2025_01.csv')
+SNAPSHOT_PATHS = []
 N_COMPONENTS = None 
+N_WORKERS = None
+LOW_MEMORY = False
+SQL_BACKEND = False
+SAMPLE_FRACTION = None
+SAMPLE_SEED = 42
+CITY = 'los-angeles'
+SNAPSHOT_DATE = None
+RESULT_STORE_NAME = 'result_history.sqlite'
 
 PRICE_COLUMNS = ['price', 'weekly_price', 'monthly_price', 'security_deposit', 'cleaning_fee', 'extra_people']
 DATE_COLUMNS = ['last_scraped', 'host_since', 'calendar_last_scraped']
-BINARY_FEATURES = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
\ No newline at end of file
+BINARY_FEATURES = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
+TEXT_COLUMNS = ['name', 'description', 'neighborhood_overview']
+
+SPATIAL_K_NEIGHBORS = 10
+SPATIAL_RADIUS_KM = 1.0
+SPATIAL_QUERY_BATCH_SIZE = 20000
+
+SIMILARITY_TOP_K = 10
+SIMILARITY_QUERY_BATCH_SIZE = 2048
+SIMILARITY_N_PROBE = 8
+
+SEGMENT_K_VALUES = list(range(2, 13))
+SEGMENT_SAMPLE_ROWS = 20000
+SEGMENT_SILHOUETTE_ROWS = 5000
+SEGMENT_CHUNK_ROWS = 10000
+SEGMENT_PASSES = 3
+SEGMENT_PRICE_BLIND_COLUMNS = ['price', 'price_per_bedroom']
+SEGMENT_FIXED_EFFECTS = True
+
+SHARED_MATRIX_CHUNK_ROWS = 100000
+GROUPED_MIN_LISTINGS = 50
+HYPOTHESIS_PERMUTATIONS = 1000
+PERMUTATION_BATCH_SIZE = 50
+LOW_MEMORY_PERMUTATION_BATCH_SIZE = 5
+FDR_ALPHA = 0.05
+SAMPLE_STRATA = ['neighbourhood_cleansed', 'room_type']
+SAMPLE_MIN_PER_STRATUM = 1
+SAMPLE_CONFIDENCE = 0.95
+CV_FOLDS = 0
+REGULARIZATION_CV_FOLDS = 5
+REGULARIZATION_METHOD = None
+FEATURE_IMPORTANCE_METHOD = 'impurity'
+QUANTILE_MODE = False
+QUANTILE_GRID = [0.1, 0.25, 0.5, 0.75, 0.9]
+QUANTILE_BACKEND = 'linear'
+QUANTILE_MAX_ITER = 1000
+QUANTILE_TOL = 1e-6
+QUANTILE_EFFECT_ROWS = 5000
+COERCE_MAX_MISSING = 0.5
+
+CALENDAR_CHUNK_ROWS = 1000000
+# Calendar features the hedonic models may use; the price-based ones encode the listing's own price
+CALENDAR_MODEL_FEATURES = ['cal_occupancy_rate']
+REVIEWS_CHUNK_ROWS = 1000000
+REVIEW_BURST_WINDOW_DAYS = 30
+REVIEW_BURST_RATIO = 3.0
+PANEL_MOMENTUM_WINDOW = 3
+
+TEXT_HASH_FEATURES = 2 ** 18
+TEXT_CHUNK_ROWS = 20000
+
+MINHASH_NUM_PERM = 128
+MINHASH_CHUNK_ROWS = 2000
+MINHASH_BLOCK_ELEMENTS = 8000000
+LSH_BANDS = 16
+LSH_FULL_BUCKET_SIZE = 50
+NEAR_DUPLICATE_THRESHOLD = 0.8
+DEDUP_NEAR_DUPLICATES = False
+
+FIGURE_DPI = 300
+FIGURE_WORKERS = 2
+FIGURE_MAX_FLIERS = 500
\ No newline at end of file
@@ -1,11 +1,15 @@
+import os
+from config.config import DATA_PATH, CALENDAR_PATH, REVIEWS_PATH
 from src.data_loader import load_data, explore_data
 from src.data_cleaner import clean_data, handle_missing_values
+from src.calendar_ingester import ingest_calendar
+from src.reviews_ingester import ingest_reviews, compute_review_features
 from src.utils import save_results, print_summary
 
-def run_data_cleaning_pipeline():
+def run_data_cleaning_pipeline(file_path=DATA_PATH):
     print("Starting LA Airbnb Data Cleaning Pipeline\n")
     
-    df = load_data()
+    df = load_data(file_path)
     if df is None:
         return None
     
@@ -16,6 +20,14 @@ def run_data_cleaning_pipeline():
     save_results(df_clean, df_filled)
     print_summary(df, df_filled)
     
+    if os.path.exists(CALENDAR_PATH):
+        ingest_calendar()
+    
+    if os.path.exists(REVIEWS_PATH):
+        review_series = ingest_reviews()
+        if review_series is not None:
+            compute_review_features(review_series)
+    
     print("\nData cleaning pipeline completed successfully")
     return {'original_df': df, 'cleaned_df': df_filled}
 
@@ -1,26 +1,131 @@
-# main.py (optional orchestrator)
-from data_cleaning_pipeline import run_data_cleaning_pipeline
-from pca_analysis_pipeline import run_pca_analysis_pipeline
-
-def main():
-    print("LA Airbnb Analysis - Choose Pipeline:")
-    print("1. Data Cleaning Pipeline")
-    print("2. PCA Analysis Pipeline")
-    print("3. Both Pipelines")
-    
-    choice = input("Enter your choice (1-3): ").strip()
-    
-    if choice == "1":
-        run_data_cleaning_pipeline()
-    elif choice == "2":
-        run_pca_analysis_pipeline()
-    elif choice == "3":
-        print("\nRunning Data Cleaning Pipeline...")
-        cleaning_results = run_data_cleaning_pipeline()
-        print("\nRunning PCA Analysis Pipeline...")
-        pca_results = run_pca_analysis_pipeline()
+# main.py - command-line orchestrator with stage selection and resumable checkpoints
+import os
+import argparse
+from config.config import (DATA_PATH, OUTPUT_PATH3, N_WORKERS, LOW_MEMORY, SQL_BACKEND, SAMPLE_FRACTION, SAMPLE_SEED,
+                           CITY, SNAPSHOT_DATE, SNAPSHOT_PATHS, N_COMPONENTS, DEDUP_NEAR_DUPLICATES, CV_FOLDS,
+                           REGULARIZATION_METHOD, FEATURE_IMPORTANCE_METHOD, QUANTILE_MODE, QUANTILE_GRID,
+                           QUANTILE_BACKEND, REPO_DIR)
+from src.checkpoint import input_fingerprint, open_checkpoints, declare_dependencies, is_complete, run_stage
+from src.lazy_imports import use_headless_backend
+from src.memory import set_low_memory
+from src.sampling import sample_run_name
+
+PIPELINE_STAGES = ['clean', 'pca']
+PIPELINE_STAGE_DEPENDENCIES = {'pca': ['clean']}
+
+def parse_args(argv=None):
+    from price_analysis_pipeline.main_price_analysis import PRICE_STAGES
+
+    all_stages = PIPELINE_STAGES + PRICE_STAGES
+    parser = argparse.ArgumentParser(description="LA Airbnb analysis pipelines")
+    parser.add_argument('--data', default=DATA_PATH, help="raw listings CSV")
+    parser.add_argument('--processed-data', default=OUTPUT_PATH3,
+                        help="cleaned listings CSV used by the price analysis stages")
+    parser.add_argument('--output-dir', default=os.path.join(REPO_DIR, 'price_analysis_pipeline', 'results'),
+                        help="where figures, result tables and checkpoints are written")
+    parser.add_argument('--stages', default='all',
+                        help=f"comma-separated stages to run, 'price' for all price stages, or 'all' "
+                             f"(available: {', '.join(all_stages)})")
+    parser.add_argument('--workers', type=int, default=N_WORKERS, help="worker processes for parallel stages")
+    parser.add_argument('--fresh', action='store_true', help="ignore existing checkpoints and start over")
+    parser.add_argument('--low-memory', action='store_true', default=LOW_MEMORY,
+                        help="copy-on-write working copies instead of full frame copies (same outputs)")
+    parser.add_argument('--sql-backend', action='store_true', default=SQL_BACKEND,
+                        help="run aggregations in DuckDB over a Parquet copy of the data (needs duckdb)")
+    parser.add_argument('--sample-fraction', type=float, default=SAMPLE_FRACTION,
+                        help="run the price stages on a stratified sample of this fraction of the listings")
+    parser.add_argument('--seed', type=int, default=SAMPLE_SEED, help="seed of the stratified sample")
+    parser.add_argument('--quantiles', default=','.join(map(str, QUANTILE_GRID)) if QUANTILE_MODE else None,
+                        help="comma-separated log-price quantiles to fit (e.g. 0.1,0.25,0.5,0.75,0.9)")
+    parser.add_argument('--quantile-backend', choices=['linear', 'hgb'], default=QUANTILE_BACKEND,
+                        help="linear quantile regression, or histogram gradient boosting for large data")
+    parser.add_argument('--city', default=CITY, help="city the results are recorded under in the run history")
+    parser.add_argument('--snapshot-date', default=SNAPSHOT_DATE,
+                        help="snapshot date recorded in the run history (default: latest last_scraped date, "
+                             "else the file's modification date)")
+    parser.add_argument('--snapshot', action='append', dest='snapshots', metavar='DATE=PATH',
+                        help="earlier listings snapshot for the panel features (repeatable)")
+    args = parser.parse_args(argv)
+    if args.sample_fraction is not None and not 0 < args.sample_fraction <= 1:
+        parser.error("--sample-fraction must be in (0, 1]")
+    if args.quantiles:
+        try:
+            args.quantiles = sorted(float(q) for q in args.quantiles.split(','))
+        except ValueError:
+            parser.error("--quantiles must be comma-separated numbers")
+        if not all(0 < q < 1 for q in args.quantiles):
+            parser.error("--quantiles must be strictly between 0 and 1")
+    if args.snapshots:
+        if not all('=' in snapshot for snapshot in args.snapshots):
+            parser.error("--snapshot must be DATE=PATH")
+        args.snapshots = [tuple(snapshot.split('=', 1)) for snapshot in args.snapshots]
     else:
-        print("Invalid choice")
+        args.snapshots = SNAPSHOT_PATHS
+
+    stages = []
+    for stage in args.stages.split(','):
+        stage = stage.strip()
+        if stage == 'all':
+            stages.extend(all_stages)
+        elif stage == 'price':
+            stages.extend(PRICE_STAGES)
+        elif stage in all_stages:
+            stages.append(stage)
+        else:
+            parser.error(f"unknown stage '{stage}'")
+    # Always run in pipeline order, whatever order they were given in
+    args.stages = [stage for stage in all_stages if stage in stages]
+    return args
+
+def run_pipeline(args):
+    from data_cleaning_pipeline import run_data_cleaning_pipeline
+    from pca_analysis_pipeline import run_pca_analysis_pipeline
+    from price_analysis_pipeline.main_price_analysis import run_price_analysis
+
+    use_headless_backend()
+    set_low_memory(args.low_memory)
+    settings = {
+        'n_components': N_COMPONENTS, 'dedup_near_duplicates': DEDUP_NEAR_DUPLICATES, 'cv_folds': CV_FOLDS,
+        'regularization': REGULARIZATION_METHOD, 'importance': FEATURE_IMPORTANCE_METHOD
+    }
+    fingerprint = input_fingerprint([args.data], settings)
+    checkpoints = open_checkpoints(os.path.join(args.output_dir, 'checkpoints'), fingerprint, fresh=args.fresh)
+    declare_dependencies(checkpoints, PIPELINE_STAGE_DEPENDENCIES)
+
+    def cleaned_listings():
+        return run_stage(checkpoints, 'clean', lambda: run_data_cleaning_pipeline(args.data)['cleaned_df'])
+
+    if 'clean' in args.stages:
+        if is_complete(checkpoints, 'clean'):
+            print("\n[clean] already complete")
+        else:
+            cleaned_listings()
+
+    if 'pca' in args.stages:
+        if is_complete(checkpoints, 'pca'):
+            print("\n[pca] already complete")
+        else:
+            run_stage(checkpoints, 'pca', lambda: run_pca_analysis_pipeline(args.data, df_filled=cleaned_listings()))
+
+    price_stages = [stage for stage in args.stages if stage not in PIPELINE_STAGES]
+    if price_stages:
+        price_checkpoints = checkpoints
+        if args.sample_fraction:
+            # Sampled price stages keep their own checkpoints next to the full run's
+            price_checkpoints = open_checkpoints(
+                os.path.join(checkpoints['dir'], sample_run_name(args.sample_fraction, args.seed)),
+                fingerprint, fresh=args.fresh
+            )
+        run_price_analysis(args.processed_data, results_dir=args.output_dir,
+                           processed_dir=os.path.dirname(args.processed_data) or '.', stages=price_stages,
+                           n_workers=args.workers, checkpoints=price_checkpoints,
+                           sample_fraction=args.sample_fraction, sample_seed=args.seed, city=args.city,
+                           snapshot_date=args.snapshot_date, quantiles=args.quantiles,
+                           quantile_backend=args.quantile_backend, sql_backend=args.sql_backend,
+                           snapshot_paths=args.snapshots)
+
+def main(argv=None):
+    run_pipeline(parse_args(argv))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,19 +1,27 @@
+from config.config import DATA_PATH
 from src.data_loader import load_data
 from src.data_cleaner import clean_data, handle_missing_values
 from src.feature_engineer import engineer_features, select_pca_features
-from src.pca_analyzer import perform_pca, analyze_pca_results
+from src.pca_analyzer import perform_pca, analyze_pca_results, save_pca_model
+from src.segmentation import segment_listings, price_blind_projection
 from src.debug_utils import check_non_numeric_values
+from src.calendar_ingester import load_calendar_features
 
-def run_pca_analysis_pipeline():
+def run_pca_analysis_pipeline(file_path=DATA_PATH, df_filled=None):
     print("Starting LA Airbnb PCA Analysis Pipeline\n")
     
-    df = load_data()
-    if df is None:
-        return None
+    # An already-cleaned frame (e.g. from a checkpoint) skips reloading and recleaning
+    if df_filled is None:
+        df = load_data(file_path)
+        if df is None:
+            return None
+        
+        df_clean = clean_data(df)
+        df_filled = handle_missing_values(df_clean)
     
-    df_clean = clean_data(df)
-    df_filled = handle_missing_values(df_clean)
-    df_featured = engineer_features(df_filled)
+    calendar_features = load_calendar_features()
+    feature_tables = [calendar_features] if calendar_features is not None else None
+    df_featured = engineer_features(df_filled, feature_tables=feature_tables)
     
     pca_data, feature_names = select_pca_features(df_featured)
     check_non_numeric_values(pca_data)
@@ -23,15 +31,26 @@ def run_pca_analysis_pipeline():
         pca_model, final_features, principal_df
     )
     
+    save_pca_model(pca_model, scaler, final_features)
+    
+    # Segments are fitted on the price-blind projection they are later assigned with
+    pca_bundle = {'pca': pca_model, 'scaler': scaler, 'features': list(final_features)}
+    segment_ids, segment_sweep = segment_listings(price_blind_projection(df_featured, pca_bundle))
+    
     for col in principal_df.columns:
         df_featured[col] = principal_df[col]
     
+    df_featured['segment_id'] = segment_ids
+    
     print("\nPCA analysis pipeline completed successfully")
     return {
         'cleaned_df': df_featured,
         'pca_model': pca_model,
+        'scaler': scaler,
+        'principal_df': principal_df,
         'components_df': components_df,
-        'explained_variance': explained_var
+        'explained_variance': explained_var,
+        'segment_sweep': segment_sweep
     }
 
 if __name__ == "__main__":
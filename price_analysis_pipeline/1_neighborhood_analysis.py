@@ -1,21 +1,31 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
 
-def analyze_neighborhood_effects(df):
-    print("=== NEIGHBORHOOD PRICE ANALYSIS ===")
-    
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import GROUPED_MIN_LISTINGS, QUANTILE_GRID, QUANTILE_BACKEND
+from src.grouped_regression import fit_grouped_ols
+from src.quantile_regression import fit_quantile_grid, quantile_premium_table
+from src.figure_renderer import barh_panel, render_figure, wait_for_figures
+from src.lazy_imports import lazy_import
+from src.memory import working_copy, dummy_block
+
+sm = lazy_import('statsmodels.api')
+
+def build_neighborhood_design(df):
+    """
+    Controls plus top-10 neighborhood dummies and log price, restricted to
+    complete rows; shared by the mean and quantile models
+    """
     # First, let's create the neighborhood dummy variables
     print("Creating neighborhood dummy variables...")
     top_neighborhoods = df['neighbourhood_cleansed'].value_counts().head(10).index
-    df_analysis = df.copy()
+    df_analysis = working_copy(df)
     df_analysis['neighbourhood_group'] = df_analysis['neighbourhood_cleansed'].apply(
         lambda x: x if x in top_neighborhoods else 'Other'
     )
-    neighborhood_dummies = pd.get_dummies(df_analysis['neighbourhood_group'], prefix='neighborhood')
+    neighborhood_dummies = dummy_block(df_analysis['neighbourhood_group'], 'neighborhood')
     df_analysis = pd.concat([df_analysis, neighborhood_dummies], axis=1)
     
     # Convert binary features from t/f to 1/0
@@ -42,7 +52,7 @@ def analyze_neighborhood_effects(df):
     print(f"Using {len(available_features)} features for analysis")
     
     # Create clean dataset
-    X = df_analysis[available_features].copy()
+    X = working_copy(df_analysis[available_features])
     y = np.log(df_analysis['price'])
     
     # Convert all boolean columns to int64
@@ -62,6 +72,12 @@ def analyze_neighborhood_effects(df):
     y_clean = y[valid_indices]
     
     print(f"Final data shape: X={X_clean.shape}, y={y_clean.shape}")
+    return X_clean, y_clean, neighborhood_features
+
+def analyze_neighborhood_effects(df, results_dir='results'):
+    print("=== NEIGHBORHOOD PRICE ANALYSIS ===")
+    
+    X_clean, y_clean, neighborhood_features = build_neighborhood_design(df)
     
     if X_clean.shape[0] == 0:
         print("ERROR: No valid data remaining after cleaning")
@@ -84,6 +100,7 @@ def analyze_neighborhood_effects(df):
                 'neighborhood': feature.replace('neighborhood_', ''),
                 'premium_multiplier': np.exp(coef),
                 'premium_percent': (np.exp(coef) - 1) * 100,
+                'std_error': model.bse[feature],
                 'p_value': pval,
                 'significant': pval < 0.05
             })
@@ -91,16 +108,13 @@ def analyze_neighborhood_effects(df):
     neighborhood_df = pd.DataFrame(neighborhood_coefs)
     
     if len(neighborhood_df) > 0:
-        plt.figure(figsize=(12, 8))
         significant_df = neighborhood_df[neighborhood_df['significant']].sort_values('premium_percent')
         
         if len(significant_df) > 0:
-            plt.barh(significant_df['neighborhood'], significant_df['premium_percent'])
-            plt.xlabel('Price Premium (%)')
-            plt.title('Neighborhood Price Premiums (Controlling for Property Characteristics)')
-            plt.tight_layout()
-            plt.savefig('results/neighborhood_effects/neighborhood_premiums.png', dpi=300, bbox_inches='tight')
-            plt.close()
+            render_figure(os.path.join(results_dir, 'neighborhood_effects', 'neighborhood_premiums.png'), [
+                barh_panel(significant_df['neighborhood'], significant_df['premium_percent'],
+                           'Neighborhood Price Premiums (Controlling for Property Characteristics)', 'Price Premium (%)')
+            ], figsize=(12, 8))
             print(f"Saved visualization with {len(significant_df)} significant neighborhoods")
         else:
             print("No significant neighborhoods found for visualization")
@@ -109,16 +123,66 @@ def analyze_neighborhood_effects(df):
     
     return neighborhood_df, model
 
+def analyze_neighborhood_quantiles(df, quantiles=QUANTILE_GRID, backend=QUANTILE_BACKEND, n_workers=None):
+    """
+    Neighborhood premiums at each quantile of log price, same controls as
+    analyze_neighborhood_effects
+    """
+    print("=== NEIGHBORHOOD PRICE QUANTILES ===")
+    X_clean, y_clean, neighborhood_features = build_neighborhood_design(df)
+    if X_clean.shape[0] == 0:
+        print("ERROR: No valid data remaining after cleaning")
+        return None
+    fits = fit_quantile_grid(X_clean, y_clean, X_clean.columns, quantiles, backend, n_workers)
+    return quantile_premium_table(fits, neighborhood_features, 'neighborhood', prefix='neighborhood_')
+
+def analyze_neighborhood_slopes(df, min_listings=GROUPED_MIN_LISTINGS):
+    """
+    Fit the control-feature model separately in every neighborhood with at
+    least min_listings listings, in one batched pass over the data
+    """
+    print("=== PER-NEIGHBORHOOD MARGINAL VALUES ===")
+    
+    df_analysis = working_copy(df)
+    binary_features = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
+    for feature in binary_features:
+        if feature in df_analysis.columns and not pd.api.types.is_numeric_dtype(df_analysis[feature]):
+            df_analysis[feature] = df_analysis[feature].map({'t': 1, 'f': 0}).fillna(0)
+    
+    control_features = [
+        'accommodates', 'bedrooms', 'bathrooms', 'beds',
+        'minimum_nights', 'availability_30',
+        'host_is_superhost', 'host_has_profile_pic', 'host_identity_verified',
+        'instant_bookable', 'amenities_count'
+    ]
+    available_features = [f for f in control_features if f in df_analysis.columns]
+    
+    slopes = fit_grouped_ols(df_analysis, available_features, min_group_size=min_listings)
+    
+    for feature in ['bedrooms', 'accommodates', 'host_is_superhost']:
+        feature_slopes = slopes[slopes['feature'] == feature]
+        if len(feature_slopes) > 0:
+            print(f"{feature}: premium ranges from {feature_slopes['premium_percent'].min():.1f}% "
+                  f"to {feature_slopes['premium_percent'].max():.1f}% "
+                  f"({feature_slopes['significant'].sum()} of {len(feature_slopes)} neighborhoods significant)")
+    
+    return slopes
+
 if __name__ == "__main__":
+    # Paths are resolved from this file, so the script runs from any directory
+    pipeline_dir = os.path.dirname(os.path.abspath(__file__))
+    results_dir = os.path.join(pipeline_dir, 'results')
     print("Loading pre-processed data...")
-    df = pd.read_csv('../Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv')
+    df = pd.read_csv(os.path.join(pipeline_dir, '..', 'Dataset Processed',
+                                  'la_airbnb_cleaned_and_missing_values_handled.csv'))
     
     print(f"Data loaded: {df.shape}")
     print(f"Price range: ${df['price'].min():.2f} - ${df['price'].max():.2f}")
     
-    os.makedirs('results/neighborhood_effects', exist_ok=True)
+    os.makedirs(os.path.join(results_dir, 'neighborhood_effects'), exist_ok=True)
     
-    neighborhood_results, model = analyze_neighborhood_effects(df)
+    neighborhood_results, model = analyze_neighborhood_effects(df, results_dir=results_dir)
+    wait_for_figures()
     
     if neighborhood_results is not None and len(neighborhood_results) > 0:
         print("="*60)
@@ -139,7 +203,7 @@ if __name__ == "__main__":
             significance = "***" if row['significant'] else ""
             print(f"  {row['neighborhood']}: {row['premium_percent']:.1f}% {significance}")
         
-        print(f"\nVisualization saved to: results/neighborhood_effects/neighborhood_premiums.png")
+        print(f"\nVisualization saved to: {os.path.join(results_dir, 'neighborhood_effects', 'neighborhood_premiums.png')}")
         print("Neighborhood analysis complete!")
         
         # Show model summary
@@ -147,6 +211,11 @@ if __name__ == "__main__":
         print(f"R-squared: {model.rsquared:.3f}")
         print(f"Adjusted R-squared: {model.rsquared_adj:.3f}")
         
+        neighborhood_slopes = analyze_neighborhood_slopes(df)
+        slopes_path = os.path.join(results_dir, 'neighborhood_effects', 'neighborhood_slopes.csv')
+        neighborhood_slopes.to_csv(slopes_path, index=False)
+        print(f"Per-neighborhood coefficients saved to: {slopes_path}")
+        
     else:
         print("Analysis failed or no neighborhood results found")
 
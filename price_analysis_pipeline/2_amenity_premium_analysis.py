@@ -1,9 +1,17 @@
 import re
 import numpy as np
-import statsmodels.api as sm
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import QUANTILE_GRID, QUANTILE_BACKEND
+from src.quantile_regression import fit_quantile_grid, quantile_premium_table
+from src.figure_renderer import barh_panel, render_figure, wait_for_figures
+from src.lazy_imports import lazy_import
+from src.memory import working_copy
+
+sm = lazy_import('statsmodels.api')
 
 def extract_amenity_features(df):
     """
@@ -30,12 +38,11 @@ def extract_amenity_features(df):
     
     return df
 
-def analyze_amenity_premiums(df):
+def build_amenity_design(df):
     """
-    Calculate price premiums for specific amenities
+    Controls plus amenity indicators and log price, restricted to complete
+    rows; shared by the mean and quantile models
     """
-    print("=== AMENITY PREMIUM ANALYSIS ===")
-    
     # Use EXACTLY the same control features as neighborhood analysis
     control_features = [
         'accommodates', 'bedrooms', 'bathrooms', 'beds',
@@ -47,7 +54,7 @@ def analyze_amenity_premiums(df):
     # Convert binary features from t/f to 1/0 (EXACTLY like neighborhood analysis)
     binary_features = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
     for feature in binary_features:
-        if feature in df.columns:
+        if feature in df.columns and not pd.api.types.is_numeric_dtype(df[feature]):
             df[feature] = df[feature].map({'t': 1, 'f': 0}).fillna(0)
             print(f"Converted {feature}: {df[feature].value_counts().to_dict()}")
     
@@ -63,7 +70,7 @@ def analyze_amenity_premiums(df):
     print(f"Using {len(available_features)} features for analysis")
     
     # Create clean dataset (EXACTLY like neighborhood analysis)
-    X = df[available_features].copy()
+    X = working_copy(df[available_features])
     y = np.log(df['price'])
     
     # Convert all boolean columns to int64 (EXACTLY like neighborhood analysis)
@@ -78,6 +85,15 @@ def analyze_amenity_premiums(df):
     y_clean = y[valid_indices]
     
     print(f"Final data shape: X={X_clean.shape}, y={y_clean.shape}")
+    return X_clean, y_clean, amenity_features
+
+def analyze_amenity_premiums(df, results_dir='results'):
+    """
+    Calculate price premiums for specific amenities
+    """
+    print("=== AMENITY PREMIUM ANALYSIS ===")
+    
+    X_clean, y_clean, amenity_features = build_amenity_design(df)
     
     if X_clean.shape[0] == 0:
         print("ERROR: No valid data remaining after cleaning")
@@ -98,6 +114,7 @@ def analyze_amenity_premiums(df):
                 'amenity': amenity.replace('has_', ''),
                 'premium_percent': premium_pct,
                 'premium_multiplier': np.exp(coef),
+                'std_error': model.bse[amenity],
                 'p_value': pval,
                 'significant': pval < 0.05,
                 'count': df[amenity].sum()
@@ -107,34 +124,51 @@ def analyze_amenity_premiums(df):
     
     # Visualization
     if len(amenity_df) > 0:
-        plt.figure(figsize=(10, 6))
         significant_amenities = amenity_df[amenity_df['significant']].sort_values('premium_percent')
         
         if len(significant_amenities) > 0:
-            plt.barh(significant_amenities['amenity'], significant_amenities['premium_percent'])
-            plt.xlabel('Price Premium (%)')
-            plt.title('Amenity Price Premiums (Controlling for Property Characteristics)')
-            plt.tight_layout()
-            plt.savefig('results/amenity_premiums/amenity_premiums.png', dpi=300, bbox_inches='tight')
-            plt.close()
+            render_figure(os.path.join(results_dir, 'amenity_premiums', 'amenity_premiums.png'), [
+                barh_panel(significant_amenities['amenity'], significant_amenities['premium_percent'],
+                           'Amenity Price Premiums (Controlling for Property Characteristics)', 'Price Premium (%)')
+            ], figsize=(10, 6))
             print(f"Saved visualization with {len(significant_amenities)} significant amenities")
     
     return amenity_df, model
 
+def analyze_amenity_quantiles(df, quantiles=QUANTILE_GRID, backend=QUANTILE_BACKEND, n_workers=None):
+    """
+    Amenity premiums at each quantile of log price, same controls as
+    analyze_amenity_premiums
+    """
+    print("=== AMENITY PREMIUM QUANTILES ===")
+    X_clean, y_clean, amenity_features = build_amenity_design(df)
+    if X_clean.shape[0] == 0:
+        print("ERROR: No valid data remaining after cleaning")
+        return None
+    fits = fit_quantile_grid(X_clean, y_clean, X_clean.columns, quantiles, backend, n_workers)
+    amenity_df = quantile_premium_table(fits, amenity_features, 'amenity', prefix='has_')
+    amenity_df['count'] = amenity_df['amenity'].map(lambda amenity: df[f'has_{amenity}'].sum())
+    return amenity_df
+
 if __name__ == "__main__":
+    # Paths are resolved from this file, so the script runs from any directory
+    pipeline_dir = os.path.dirname(os.path.abspath(__file__))
+    results_dir = os.path.join(pipeline_dir, 'results')
     print("Loading pre-processed data...")
-    df = pd.read_csv('../Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv')
+    df = pd.read_csv(os.path.join(pipeline_dir, '..', 'Dataset Processed',
+                                  'la_airbnb_cleaned_and_missing_values_handled.csv'))
     
     print(f"Data loaded: {df.shape}")
     print(f"Price range: ${df['price'].min():.2f} - ${df['price'].max():.2f}")
     
-    os.makedirs('results/amenity_premiums', exist_ok=True)
+    os.makedirs(os.path.join(results_dir, 'amenity_premiums'), exist_ok=True)
     
     # Extract amenities first
     df_with_amenities = extract_amenity_features(df)
     
     # Run analysis
-    amenity_results, model = analyze_amenity_premiums(df_with_amenities)
+    amenity_results, model = analyze_amenity_premiums(df_with_amenities, results_dir=results_dir)
+    wait_for_figures()
     
     if amenity_results is not None and len(amenity_results) > 0:
         print("\n" + "="*60)
@@ -154,7 +188,7 @@ if __name__ == "__main__":
             significance = "***" if row['significant'] else ""
             print(f"  {row['amenity']}: {row['premium_percent']:.1f}% {significance}")
         
-        print(f"\nVisualization saved to: results/amenity_premiums/amenity_premiums.png")
+        print(f"\nVisualization saved to: {os.path.join(results_dir, 'amenity_premiums', 'amenity_premiums.png')}")
         print("Amenity analysis complete!")
         
         # Show model summary
@@ -1,14 +1,23 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 import numpy as np
-from scipy import stats
 import os
-import statsmodels.api as sm
+import sys
 
-def analyze_host_behavior(df):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.hypothesis_testing import grouped_welch_tests
+from src.figure_renderer import boxplot_summary, box_panel, barh_panel, render_figure, wait_for_figures
+from src.lazy_imports import lazy_import
+from src.memory import working_copy, dummy_block
+
+sm = lazy_import('statsmodels.api')
+stats = lazy_import('scipy.stats')
+
+def analyze_host_behavior(df, results_dir='results', aggregates=None):
     """
     Analyze multi-listing host clustering and pricing behavior
+    aggregates: optional precomputed neighborhood_host_counts,
+    pricing_comparison and top_neighborhoods (see src/sql_backend.py), used
+    instead of the pandas groupbys below
     """
     print("=== MULTI-LISTING HOST ANALYSIS ===")
     
@@ -16,28 +25,34 @@ def analyze_host_behavior(df):
     df['is_multi_lister'] = df['calculated_host_listings_count'] > 1
     df['is_professional_host'] = df['calculated_host_listings_count'] > 5
     
-    # Analyze geographic clustering
-    neighborhood_host_counts = df.groupby('neighbourhood_cleansed').agg({
-        'host_id': 'nunique',
-        'calculated_host_listings_count': 'sum',
-        'price': 'mean'
-    }).reset_index()
-    
-    neighborhood_host_counts['listings_per_host'] = (
-        neighborhood_host_counts['calculated_host_listings_count'] / 
-        neighborhood_host_counts['host_id']
-    )
-    
-    # Compare pricing behavior
-    pricing_comparison = df.groupby('is_multi_lister').agg({
-        'price': ['mean', 'median', 'count'],
-        'review_scores_rating': 'mean',
-        'availability_30': 'mean'
-    }).round(2)
+    if aggregates is not None:
+        neighborhood_host_counts = aggregates['neighborhood_host_counts']
+        pricing_comparison = aggregates['pricing_comparison']
+        top_neighborhoods = aggregates['top_neighborhoods']
+    else:
+        # Analyze geographic clustering
+        neighborhood_host_counts = df.groupby('neighbourhood_cleansed').agg({
+            'host_id': 'nunique',
+            'calculated_host_listings_count': 'sum',
+            'price': 'mean'
+        }).reset_index()
+        
+        neighborhood_host_counts['listings_per_host'] = (
+            neighborhood_host_counts['calculated_host_listings_count'] / 
+            neighborhood_host_counts['host_id']
+        )
+        
+        # Compare pricing behavior
+        pricing_comparison = df.groupby('is_multi_lister').agg({
+            'price': ['mean', 'median', 'count'],
+            'review_scores_rating': 'mean',
+            'availability_30': 'mean'
+        }).round(2)
+        
+        top_neighborhoods = df['neighbourhood_cleansed'].value_counts().head(10).index
     
     # Professional vs individual host pricing by neighborhood
     # Focus on top neighborhoods for cleaner analysis
-    top_neighborhoods = df['neighbourhood_cleansed'].value_counts().head(10).index
     df_top_neighborhoods = df[df['neighbourhood_cleansed'].isin(top_neighborhoods)]
     
     professional_pricing = df_top_neighborhoods.groupby(['neighbourhood_cleansed', 'is_professional_host']).agg({
@@ -53,47 +68,34 @@ def analyze_host_behavior(df):
     
     print(f"Multi-lister vs Single-lister price difference p-value: {p_value:.4f}")
     
-    # Visualization
-    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-    
-    # Price distribution by host type
-    sns.boxplot(data=df, x='is_multi_lister', y='price', ax=axes[0, 0])
-    axes[0, 0].set_title('Price Distribution: Multi-lister vs Single-lister')
-    axes[0, 0].set_xlabel('Is Multi-lister')
-    axes[0, 0].set_ylabel('Price ($)')
+    # Professional vs other hosts within every neighborhood x room type cell,
+    # with Benjamini-Hochberg control across the cells
+    grouped_price_tests = grouped_welch_tests(df, log_values=True)
     
-    # Geographic clustering
+    # Visualization: summaries are computed here, the figure renders in the background
     top_neighborhoods_clustering = neighborhood_host_counts.nlargest(10, 'listings_per_host')
-    sns.barplot(data=top_neighborhoods_clustering, x='listings_per_host', y='neighbourhood_cleansed', ax=axes[0, 1])
-    axes[0, 1].set_title('Top Neighborhoods by Listings per Host')
-    axes[0, 1].set_xlabel('Average Listings per Host')
-    
-    # Review scores comparison
-    sns.boxplot(data=df, x='is_multi_lister', y='review_scores_rating', ax=axes[1, 0])
-    axes[1, 0].set_title('Review Scores: Multi-lister vs Single-lister')
-    axes[1, 0].set_xlabel('Is Multi-lister')
-    axes[1, 0].set_ylabel('Review Score')
-    
-    # Availability comparison
-    sns.boxplot(data=df, x='is_multi_lister', y='availability_30', ax=axes[1, 1])
-    axes[1, 1].set_title('Availability: Multi-lister vs Single-lister')
-    axes[1, 1].set_xlabel('Is Multi-lister')
-    axes[1, 1].set_ylabel('Availability (30 days)')
-    
-    plt.tight_layout()
-    plt.savefig('results/host_behavior/host_analysis.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    render_figure(os.path.join(results_dir, 'host_behavior', 'host_analysis.png'), [
+        box_panel(boxplot_summary(df, 'is_multi_lister', 'price'),
+                  'Price Distribution: Multi-lister vs Single-lister', 'Is Multi-lister', 'Price ($)'),
+        barh_panel(top_neighborhoods_clustering['neighbourhood_cleansed'], top_neighborhoods_clustering['listings_per_host'],
+                   'Top Neighborhoods by Listings per Host', 'Average Listings per Host', 'neighbourhood_cleansed',
+                   top_down=True),
+        box_panel(boxplot_summary(df, 'is_multi_lister', 'review_scores_rating'),
+                  'Review Scores: Multi-lister vs Single-lister', 'Is Multi-lister', 'Review Score'),
+        box_panel(boxplot_summary(df, 'is_multi_lister', 'availability_30'),
+                  'Availability: Multi-lister vs Single-lister', 'Is Multi-lister', 'Availability (30 days)')
+    ], layout=(2, 2), figsize=(15, 12))
     
     # Additional analysis: Price premium by host type controlling for neighborhood
     print("\n=== PRICE PREMIUM ANALYSIS CONTROLLING FOR NEIGHBORHOOD ===")
     
     # Create neighborhood dummies for regression
-    top_neighborhoods_reg = df['neighbourhood_cleansed'].value_counts().head(10).index
-    df_reg = df.copy()
+    top_neighborhoods_reg = top_neighborhoods
+    df_reg = working_copy(df)
     df_reg['neighbourhood_group'] = df_reg['neighbourhood_cleansed'].apply(
         lambda x: x if x in top_neighborhoods_reg else 'Other'
     )
-    neighborhood_dummies = pd.get_dummies(df_reg['neighbourhood_group'], prefix='neighborhood')
+    neighborhood_dummies = dummy_block(df_reg['neighbourhood_group'], 'neighborhood')
     df_reg = pd.concat([df_reg, neighborhood_dummies], axis=1)
     
     # Control features
@@ -107,13 +109,13 @@ def analyze_host_behavior(df):
     # Convert binary features
     binary_features = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
     for feature in binary_features:
-        if feature in df_reg.columns and df_reg[feature].dtype == 'object':
+        if feature in df_reg.columns and not pd.api.types.is_numeric_dtype(df_reg[feature]):
             df_reg[feature] = df_reg[feature].map({'t': 1, 'f': 0}).fillna(0)
     
     neighborhood_features = [col for col in df_reg.columns if col.startswith('neighborhood_')]
     features = control_features + neighborhood_features + ['is_professional_host']
     
-    X = df_reg[features].copy()
+    X = working_copy(df_reg[features])
     y = np.log(df_reg['price'])
     
     # Convert boolean columns
@@ -141,20 +143,28 @@ def analyze_host_behavior(df):
         'pricing_comparison': pricing_comparison,
         'professional_pricing': professional_pricing,
         'price_difference_test': {'t_statistic': t_stat, 'p_value': p_value},
-        'professional_host_premium': premium_pct if 'is_professional_host' in model.params else None
+        'grouped_price_tests': grouped_price_tests,
+        'professional_host_premium': premium_pct if 'is_professional_host' in model.params else None,
+        'professional_host_coefficient': model.params.get('is_professional_host'),
+        'professional_host_std_error': model.bse.get('is_professional_host')
     }
 
 if __name__ == "__main__":
+    # Paths are resolved from this file, so the script runs from any directory
+    pipeline_dir = os.path.dirname(os.path.abspath(__file__))
+    results_dir = os.path.join(pipeline_dir, 'results')
     print("Loading pre-processed data...")
-    df = pd.read_csv('../Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv')
+    df = pd.read_csv(os.path.join(pipeline_dir, '..', 'Dataset Processed',
+                                  'la_airbnb_cleaned_and_missing_values_handled.csv'))
     
     print(f"Data loaded: {df.shape}")
     print(f"Price range: ${df['price'].min():.2f} - ${df['price'].max():.2f}")
     
-    os.makedirs('results/host_behavior', exist_ok=True)
+    os.makedirs(os.path.join(results_dir, 'host_behavior'), exist_ok=True)
     
     # Run analysis
-    host_results = analyze_host_behavior(df)
+    host_results = analyze_host_behavior(df, results_dir=results_dir)
+    wait_for_figures()
     
     print("\n" + "="*60)
     print("HOST BEHAVIOR ANALYSIS RESULTS")
@@ -175,5 +185,5 @@ if __name__ == "__main__":
     for _, row in top_concentration.iterrows():
         print(f"  {row['neighbourhood_cleansed']}: {row['listings_per_host']:.1f} listings per host")
     
-    print(f"\nVisualization saved to: results/host_behavior/host_analysis.png")
+    print(f"\nVisualization saved to: {os.path.join(results_dir, 'host_behavior', 'host_analysis.png')}")
     print("Host behavior analysis complete!")
\ No newline at end of file
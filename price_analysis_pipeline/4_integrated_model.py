@@ -1,27 +1,59 @@
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
-from sklearn.ensemble import RandomForestRegressor
 import pandas as pd
 import os
+import sys
 
-def build_integrated_price_model(df):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import SHARED_MATRIX_DIR
+from src.shared_matrix import build_shared_design_matrix, attach_design_matrix, parallel_bootstrap_ols
+from src.text_features import fit_text_price_model
+from src.cross_validation import cross_validate_shared_matrix
+from src.regularization import fit_regularization_path
+from src.quantile_regression import fit_quantile_grid
+from src.permutation_importance import compute_permutation_importance
+from src.figure_renderer import barh_panel, render_figure, wait_for_figures
+from src.lazy_imports import lazy_import
+from src.memory import working_copy, dummy_block, design_matrix
+
+sm = lazy_import('statsmodels.api')
+ensemble = lazy_import('sklearn.ensemble')
+model_selection = lazy_import('sklearn.model_selection')
+
+def build_integrated_price_model(df, extra_features=None, bootstrap_resamples=0, n_workers=None,
+                                 text_matrix=None, cv_folds=0, regularization=None, importance='impurity',
+                                 results_dir='results', matrix_dir=SHARED_MATRIX_DIR,
+                                 quantiles=None, quantile_backend='linear'):
     """
     Build comprehensive price model incorporating all factors
+
+    extra_features: optional DataFrame aligned to df's index (e.g. host
+    portfolio features) whose columns are added to the model as-is
+    bootstrap_resamples: if > 0, bootstrap OLS coefficients in parallel
+    workers attached to a memory-mapped copy of the design matrix
+    text_matrix: optional sparse hashed-text matrix (one row per row of df);
+    fits a sparse ridge model alongside the OLS and reports the holdout R² lift
+    cv_folds: if > 0, report out-of-fold RMSE/MAE/R² for OLS and random forest
+    under random K-fold and neighbourhood-grouped K-fold splits
+    regularization: 'ridge', 'lasso' or 'elasticnet' to also fit a shrunken
+    model along a warm-started alpha path, choosing alpha by cross-validation
+    importance: 'impurity' (random forest feature_importances_) or
+    'permutation' (held-out permutation importance with std over repeats)
+    results_dir: where the feature importance figure is written
+    matrix_dir: where the memory-mapped design matrix and fold indices live
+    quantiles: optional grid of quantiles of log price to fit the same
+    features at ('linear' quantile regression or 'hgb' gradient boosting)
     """
     print("=== INTEGRATED PRICE MODEL ===")
     
     # First, let's create the features we need that might not exist yet
-    df_model = df.copy()
+    df_model = working_copy(df)
     
     # Create neighborhood dummies (like we did in neighborhood analysis)
     top_neighborhoods = df_model['neighbourhood_cleansed'].value_counts().head(10).index
-    df_model['neighbourhood_group'] = df_model['neighbourhood_cleansed'].apply(
-        lambda x: x if x in top_neighborhoods else 'Other'
+    neighbourhood_group = df_model['neighbourhood_cleansed'].where(
+        df_model['neighbourhood_cleansed'].isin(top_neighborhoods), 'Other'
     )
-    neighborhood_dummies = pd.get_dummies(df_model['neighbourhood_group'], prefix='neighborhood')
-    df_model = pd.concat([df_model, neighborhood_dummies], axis=1)
+    neighborhood_dummies = dummy_block(neighbourhood_group, 'neighborhood')
     
     # Create host behavior features (like we did in host analysis)
     df_model['is_multi_lister'] = df_model['calculated_host_listings_count'] > 1
@@ -41,13 +73,16 @@ def build_integrated_price_model(df):
         'has_balcony': r'balcony|Balcony|patio|Patio'
     }
     
-    for amenity, pattern in amenity_mapping.items():
-        df_model[amenity] = df_model['amenities'].str.contains(pattern, na=False).astype(int)
+    # One preallocated block for every amenity flag
+    amenity_block = np.empty((len(df_model), len(amenity_mapping)), dtype=np.int64)
+    for j, pattern in enumerate(amenity_mapping.values()):
+        amenity_block[:, j] = df_model['amenities'].str.contains(pattern, na=False).to_numpy()
+    amenity_block = pd.DataFrame(amenity_block, columns=list(amenity_mapping), index=df_model.index)
     
     # Convert binary features
     binary_features = ['host_is_superhost', 'host_has_profile_pic', 'host_identity_verified', 'instant_bookable']
     for feature in binary_features:
-        if feature in df_model.columns and df_model[feature].dtype == 'object':
+        if feature in df_model.columns and not pd.api.types.is_numeric_dtype(df_model[feature]):
             df_model[feature] = df_model[feature].map({'t': 1, 'f': 0}).fillna(0)
     
     # Feature sets - using features that actually exist in our data
@@ -63,28 +98,28 @@ def build_integrated_price_model(df):
     ]
     
     review_features = ['review_scores_rating', 'number_of_reviews', 'reviews_per_month']
-    neighborhood_features = [col for col in df_model.columns if col.startswith('neighborhood_')]
-    amenity_features = [col for col in df_model.columns if col.startswith('has_') and col in [
-        'has_pool', 'has_parking', 'has_kitchen', 'has_wifi', 'has_ac', 
-        'has_laundry', 'has_gym', 'has_breakfast', 'has_pet_friendly', 'has_balcony'
-    ]]
+    neighborhood_features = list(neighborhood_dummies.columns)
+    amenity_features = list(amenity_block.columns)
     
     all_features = (property_features + neighborhood_features + 
                    amenity_features + host_features + review_features)
     
+    # Join-ready feature blocks computed outside this script; they win over
+    # same-named columns of df, as when they were assigned into it
+    sources = [neighborhood_dummies, amenity_block, df_model]
+    if extra_features is not None:
+        sources.insert(0, extra_features)
+        all_features += [col for col in extra_features.columns if col not in all_features]
+    
     # Filter to available features
-    available_features = [f for f in all_features if f in df_model.columns]
+    available_features = [f for f in all_features if any(f in frame.columns for frame in sources)]
     
     print(f"Using {len(available_features)} features for integrated model")
     
-    X = df_model[available_features].copy()
+    # Filled straight into one preallocated float matrix (booleans become 0/1)
+    X = design_matrix(sources, available_features)
     y = np.log(df_model['price'])
     
-    # Convert boolean columns to int
-    for col in X.columns:
-        if X[col].dtype == 'bool':
-            X[col] = X[col].astype('int64')
-    
     # Remove rows with missing values
     valid_indices = X.notna().all(axis=1) & y.notna()
     X_clean = X[valid_indices]
@@ -93,7 +128,7 @@ def build_integrated_price_model(df):
     print(f"Final data shape: X={X_clean.shape}, y={y_clean.shape}")
     
     # OLS model for interpretability
-    X_sm = sm.add_constant(X_clean)
+    X_sm = sm.add_constant(X_clean, has_constant='add')
     full_model = sm.OLS(y_clean, X_sm).fit()
     
     print("=== MODEL SUMMARY ===")
@@ -101,31 +136,42 @@ def build_integrated_price_model(df):
     print(f"Adjusted R-squared: {full_model.rsquared_adj:.3f}")
     print(f"Number of observations: {full_model.nobs}")
     
-    # Feature importance from Random Forest
-    rf = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
-    rf.fit(X_clean, y_clean)
+    quantile_coefficients = None
+    if quantiles:
+        fits = fit_quantile_grid(X_clean, y_clean, available_features, quantiles, quantile_backend, n_workers)
+        quantile_coefficients = fits[['quantile', 'feature', 'coefficient', 'std_error', 'p_value', 'converged']]
     
-    feature_importance = pd.DataFrame({
-        'feature': available_features,
-        'importance': rf.feature_importances_
-    }).sort_values('importance', ascending=False)
+    # Feature importance from Random Forest
+    rf = ensemble.RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    
+    if importance == 'permutation':
+        # Impurity importance favours high-cardinality features, so score on held-out rows instead
+        X_train, X_test, y_train, y_test = model_selection.train_test_split(X_clean, y_clean, test_size=0.2, random_state=42)
+        rf.fit(X_train.to_numpy(dtype=float), y_train)
+        feature_importance = compute_permutation_importance(
+            rf, X_test, y_test, available_features, n_workers=n_workers
+        )
+    else:
+        rf.fit(X_clean, y_clean)
+        feature_importance = pd.DataFrame({
+            'feature': available_features,
+            'importance': rf.feature_importances_
+        }).sort_values('importance', ascending=False)
     
     # Top features visualization
-    plt.figure(figsize=(12, 8))
     top_features = feature_importance.head(15)
-    
-    sns.barplot(data=top_features, x='importance', y='feature')
-    plt.title('Top 15 Feature Importance for Airbnb Price Prediction')
-    plt.xlabel('Feature Importance')
-    plt.tight_layout()
-    plt.savefig('results/integrated_model/feature_importance.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    render_figure(os.path.join(results_dir, 'integrated_model', 'feature_importance.png'), [
+        barh_panel(top_features['feature'], top_features['importance'],
+                   'Top 15 Feature Importance for Airbnb Price Prediction', 'Feature Importance', 'feature',
+                   top_down=True)
+    ], figsize=(12, 8))
     
     # Show top coefficients from OLS
     print("\n=== TOP 10 POSITIVE EFFECTS ===")
     coefficients = pd.DataFrame({
         'feature': ['const'] + available_features,
         'coefficient': full_model.params,
+        'std_error': full_model.bse,
         'p_value': full_model.pvalues
     })
     positive_effects = coefficients[
@@ -149,24 +195,68 @@ def build_integrated_price_model(df):
         discount_pct = (1 - np.exp(row['coefficient'])) * 100
         print(f"  {row['feature']}: -{discount_pct:.1f}%")
     
+    regularized = None
+    if regularization is not None:
+        regularized = fit_regularization_path(X_clean, y_clean, available_features, method=regularization)
+        print(f"\n=== TOP 10 {regularization.upper()} EFFECTS (alpha={regularized['alpha']:.4g}) ===")
+        reg_coefficients = regularized['coefficients']
+        reg_coefficients = reg_coefficients[reg_coefficients['feature'] != 'const']
+        top_effects = reg_coefficients.reindex(reg_coefficients['coefficient'].abs().nlargest(10).index)
+        for _, row in top_effects.iterrows():
+            premium_pct = (np.exp(row['coefficient']) - 1) * 100
+            print(f"  {row['feature']}: {premium_pct:+.1f}%")
+    
+    text_results = None
+    if text_matrix is not None:
+        text_results = fit_text_price_model(X_clean, y_clean, text_matrix[valid_indices.to_numpy()])
+    
+    shared_meta = None
+    if bootstrap_resamples > 0 or cv_folds > 0:
+        shared_meta = build_shared_design_matrix(
+            X.assign(price=df_model['price']), available_features, output_dir=matrix_dir
+        )
+    
+    bootstrap_coefficients = None
+    if bootstrap_resamples > 0:
+        bootstrap_coefficients = parallel_bootstrap_ols(shared_meta, bootstrap_resamples, n_workers=n_workers)
+    
+    cv_metrics = None
+    if cv_folds > 0:
+        print("\n=== OUT-OF-FOLD EVALUATION ===")
+        groups = df_model.loc[attach_design_matrix(shared_meta)['row_index'], 'neighbourhood_cleansed'].to_numpy()
+        cv_metrics = pd.concat([
+            cross_validate_shared_matrix(shared_meta, n_folds=cv_folds, n_workers=n_workers),
+            cross_validate_shared_matrix(shared_meta, groups=groups, n_folds=cv_folds, n_workers=n_workers)
+        ], ignore_index=True)
+    
     return {
         'ols_model': full_model,
         'feature_importance': feature_importance,
         'rf_model': rf,
-        'coefficients': coefficients
+        'coefficients': coefficients,
+        'quantile_coefficients': quantile_coefficients,
+        'bootstrap_coefficients': bootstrap_coefficients,
+        'text_results': text_results,
+        'cv_metrics': cv_metrics,
+        'regularized': regularized
     }
 
 if __name__ == "__main__":
+    # Paths are resolved from this file, so the script runs from any directory
+    pipeline_dir = os.path.dirname(os.path.abspath(__file__))
+    results_dir = os.path.join(pipeline_dir, 'results')
     print("Loading pre-processed data...")
-    df = pd.read_csv('../Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv')
+    df = pd.read_csv(os.path.join(pipeline_dir, '..', 'Dataset Processed',
+                                  'la_airbnb_cleaned_and_missing_values_handled.csv'))
     
     print(f"Data loaded: {df.shape}")
     print(f"Price range: ${df['price'].min():.2f} - ${df['price'].max():.2f}")
     
-    os.makedirs('results/integrated_model', exist_ok=True)
+    os.makedirs(os.path.join(results_dir, 'integrated_model'), exist_ok=True)
     
     # Run integrated analysis
-    results = build_integrated_price_model(df)
+    results = build_integrated_price_model(df, results_dir=results_dir)
+    wait_for_figures()
     
     print("\n" + "="*60)
     print("INTEGRATED MODEL RESULTS")
@@ -179,5 +269,5 @@ if __name__ == "__main__":
     for _, row in results['feature_importance'].head(5).iterrows():
         print(f"  {row['feature']}: {row['importance']:.3f}")
     
-    print(f"\nVisualization saved to: results/integrated_model/feature_importance.png")
+    print(f"\nVisualization saved to: {os.path.join(results_dir, 'integrated_model', 'feature_importance.png')}")
     print("Integrated analysis complete!")
\ No newline at end of file
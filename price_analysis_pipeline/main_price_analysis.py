@@ -1,19 +1,62 @@
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import importlib.util
+import importlib
 
-def load_module_from_file(file_path, module_name):
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import (DEDUP_NEAR_DUPLICATES, CV_FOLDS, REGULARIZATION_METHOD, FEATURE_IMPORTANCE_METHOD,
+                           N_WORKERS, SAMPLE_FRACTION, SAMPLE_SEED, CITY, SNAPSHOT_DATE, RESULT_STORE_NAME,
+                           PCA_MODEL_PATH, SEGMENT_MODEL_PATH, CALENDAR_FEATURES_PATH, REVIEWS_FEATURES_PATH,
+                           CALENDAR_MODEL_FEATURES, SEGMENT_FIXED_EFFECTS, QUANTILE_MODE, QUANTILE_GRID,
+                           QUANTILE_BACKEND, SQL_BACKEND, SNAPSHOT_PATHS, PROCESSED_DIR, OUTPUT_PATH3)
+from src.checkpoint import input_fingerprint, declare_dependencies, invalidate_if_stale, is_complete, run_stage
+from src.host_index import build_host_index, compute_host_portfolio_features, host_features_for_listings
+from src.spatial_index import build_spatial_index, compute_spatial_features
+from src.calendar_ingester import load_calendar_features
+from src.reviews_ingester import load_review_features, review_features_for_listings
+from src.text_features import hash_text_features
+from src.near_duplicates import find_near_duplicates, drop_near_duplicates
+from src.feature_engineer import engineer_features
+from src.pca_analyzer import load_pca_model
+from src.segmentation import load_segment_model, segment_features_for_listings
+from src.figure_renderer import wait_for_figures
+from src.lazy_imports import use_headless_backend
+from src.memory import working_copy
+from src.result_store import record_run, snapshot_date_of
+from src.snapshot_panel import build_snapshot_panel, panel_features
+from src.sql_backend import sql_backend_available, parquet_cache, host_behavior_aggregates
+from src.sampling import load_or_draw_sample, add_premium_bounds, premium_bounds, sample_run_name
 
-def generate_final_report(neighborhood_results, amenity_results, host_results, integrated_results):
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRICE_STAGES = ['listings', 'neighborhood', 'amenity', 'host', 'quantile', 'listing_features', 'integrated', 'report']
+# Checkpointed stages and the stages whose results they are built from
+PRICE_STAGE_DEPENDENCIES = {
+    'neighborhood': ['listings'], 'amenity': ['listings'], 'host': ['listings'], 'quantile': ['listings'],
+    'listing_features': ['listings'], 'integrated': ['listings', 'listing_features']
+}
+RESULT_SUBDIRS = ['neighborhood_effects', 'amenity_premiums', 'host_behavior', 'quantile_effects', 'integrated_model']
+
+def load_analysis_module(file_name):
+    # The analysis scripts start with a digit, so they are imported by string name
+    return importlib.import_module(f'price_analysis_pipeline.{os.path.splitext(file_name)[0]}')
+
+def format_bounds(row):
+    # Sampled runs carry bounds on each premium; full runs print the estimate alone
+    if 'premium_percent_low' in row and pd.notna(row['premium_percent_low']):
+        return f" [{row['premium_percent_low']:+.1f}%, {row['premium_percent_high']:+.1f}%]"
+    return ""
+
+def generate_final_report(neighborhood_results, amenity_results, host_results, integrated_results,
+                          sample_fraction=None, quantile_results=None):
     print("="*80)
     print("FINAL ANALYSIS REPORT - LA AIRBNB PRICING DRIVERS")
     print("="*80)
     
+    if sample_fraction:
+        print(f"SAMPLED RUN: {sample_fraction:.0%} stratified sample by neighborhood x room type")
+        print("Brackets give 95% bounds on the full-data premium - confirm with a full run")
+        print("-" * 50)
+    
     print("KEY FINDINGS SUMMARY")
     print("-" * 50)
     
@@ -38,19 +81,40 @@ def generate_final_report(neighborhood_results, amenity_results, host_results, i
     if neighborhood_results is not None:
         top_5_neighborhoods = neighborhood_results.nlargest(5, 'premium_percent')
         for _, row in top_5_neighborhoods.iterrows():
-            print(f"  {row['neighborhood']}: +{row['premium_percent']:.1f}%")
+            print(f"  {row['neighborhood']}: +{row['premium_percent']:.1f}%{format_bounds(row)}")
     
     print("\nTOP 5 AMENITY PREMIUMS:")
     if amenity_results is not None:
         top_5_amenities = amenity_results.nlargest(5, 'premium_percent')
         for _, row in top_5_amenities.iterrows():
-            print(f"  {row['amenity']}: +{row['premium_percent']:.1f}%")
+            print(f"  {row['amenity']}: +{row['premium_percent']:.1f}%{format_bounds(row)}")
     
     print("\nHOST BEHAVIOR INSIGHTS:")
     if host_results is not None:
         print(f"  Multi-lister price difference p-value: {host_results['price_difference_test']['p_value']:.4f}")
         if 'professional_host_premium' in host_results:
-            print(f"  Professional host premium: {host_results['professional_host_premium']:.1f}%")
+            bounds = ""
+            if sample_fraction and host_results.get('professional_host_std_error') is not None:
+                low, high = premium_bounds(host_results['professional_host_coefficient'],
+                                           host_results['professional_host_std_error'], sample_fraction)
+                bounds = f" [{low:+.1f}%, {high:+.1f}%]"
+            print(f"  Professional host premium: {host_results['professional_host_premium']:.1f}%{bounds}")
+        if 'grouped_price_tests' in host_results:
+            tests = host_results['grouped_price_tests']
+            print(f"  Neighborhood x room type cells with a significant professional-host gap (BH q < 0.05): "
+                  f"{tests['significant'].sum()} of {tests['p_welch'].notna().sum()}")
+    
+    if quantile_results is not None:
+        print("\nPREMIUMS ACROSS THE PRICE DISTRIBUTION (budget -> luxury quantiles):")
+        for kind, name_col in [('neighborhood', 'neighborhood'), ('amenity', 'amenity')]:
+            if quantile_results[kind] is None:
+                print(f"  {kind}: no quantile fits")
+                continue
+            by_quantile = quantile_results[kind].pivot(index=name_col, columns='quantile', values='premium_percent')
+            spread = (by_quantile.iloc[:, -1] - by_quantile.iloc[:, 0]).abs().nlargest(3)
+            for name in spread.index:
+                path = ", ".join(f"q{q:g}: {value:+.1f}%" for q, value in by_quantile.loc[name].items())
+                print(f"  {kind} {name}: {path}")
     
     print("\nINTEGRATED MODEL PERFORMANCE:")
     if integrated_results is not None:
@@ -59,41 +123,261 @@ def generate_final_report(neighborhood_results, amenity_results, host_results, i
         top_features = integrated_results['feature_importance'].head(3)
         for _, row in top_features.iterrows():
             print(f"    {row['feature']}: {row['importance']:.3f}")
+        if integrated_results.get('cv_metrics') is not None:
+            print(f"  Out-of-fold performance (log price):")
+            for _, row in integrated_results['cv_metrics'].iterrows():
+                print(f"    {row['backend']} ({row['scheme']}): RMSE={row['rmse']:.3f}, MAE={row['mae']:.3f}, R²={row['r2']:.3f}")
+        if integrated_results.get('text_results') is not None:
+            print(f"  Holdout R-squared lift from listing text: {integrated_results['text_results']['r2_lift']:+.3f}")
 
-def main():
-    os.makedirs('results/neighborhood_effects', exist_ok=True)
-    os.makedirs('results/amenity_premiums', exist_ok=True)
-    os.makedirs('results/host_behavior', exist_ok=True)
-    os.makedirs('results/integrated_model', exist_ok=True)
-    
+def prepare_listings(data_path, sample_fraction=None, sample_seed=SAMPLE_SEED, sample_dir=None):
     print("Loading data...")
-    df = pd.read_csv('../Dataset Processed/la_airbnb_cleaned_and_missing_values_handled.csv')
+    df = pd.read_csv(data_path)
     
     print(f"Data loaded: {df.shape}")
+    if sample_fraction:
+        df, _ = load_or_draw_sample(df, sample_fraction, sample_dir, input_fingerprint([data_path]), seed=sample_seed)
+        print(f"Running on stratified sample: {df.shape}")
     print(f"Price range: ${df['price'].min():.2f} - ${df['price'].max():.2f}")
     
-    print("="*50)
-    print("RUNNING COMPREHENSIVE PRICE ANALYSIS")
-    print("="*50)
+    duplicate_clusters = None
+    if 'description' in df.columns or 'amenities' in df.columns:
+        duplicate_clusters = find_near_duplicates(df)
+        if DEDUP_NEAR_DUPLICATES:
+            df = drop_near_duplicates(df, duplicate_clusters)
+            duplicate_clusters = duplicate_clusters.loc[df.index]
+        df['duplicate_cluster_id'] = duplicate_clusters['duplicate_cluster_id']
     
-    neighborhood_module = load_module_from_file('1_neighborhood_analysis.py', 'neighborhood_analysis')
-    neighborhood_results, neighborhood_model = neighborhood_module.analyze_neighborhood_effects(df)
+    return df, duplicate_clusters
+
+def run_neighborhood_stage(df, results_dir, sample_fraction=None):
+    neighborhood_module = load_analysis_module('1_neighborhood_analysis.py')
+    neighborhood_results, _ = neighborhood_module.analyze_neighborhood_effects(df, results_dir=results_dir)
+    if sample_fraction:
+        neighborhood_results = add_premium_bounds(neighborhood_results, sample_fraction)
+    neighborhood_slopes = neighborhood_module.analyze_neighborhood_slopes(df)
+    neighborhood_slopes.to_csv(os.path.join(results_dir, 'neighborhood_effects', 'neighborhood_slopes.csv'), index=False)
+    wait_for_figures()
+    return neighborhood_results
+
+def run_amenity_stage(df, results_dir, sample_fraction=None):
+    amenity_module = load_analysis_module('2_amenity_premium_analysis.py')
+    df_with_amenities = amenity_module.extract_amenity_features(working_copy(df))
+    amenity_results, _ = amenity_module.analyze_amenity_premiums(df_with_amenities, results_dir=results_dir)
+    if sample_fraction:
+        amenity_results = add_premium_bounds(amenity_results, sample_fraction)
+    wait_for_figures()
+    return amenity_results
+
+def run_host_stage(df, results_dir, aggregate_source=None):
+    host_module = load_analysis_module('3_host_behavior_analysis.py')
+    aggregates = None
+    if aggregate_source is not None:
+        # Groupbys run in DuckDB over the Parquet copy; only their results come back
+        aggregates = host_behavior_aggregates(parquet_cache(aggregate_source))
+    host_results = host_module.analyze_host_behavior(df, results_dir=results_dir, aggregates=aggregates)
+    host_results['grouped_price_tests'].to_csv(os.path.join(results_dir, 'host_behavior', 'grouped_price_tests.csv'),
+                                               index=False)
+    wait_for_figures()
+    return host_results
+
+def run_quantile_stage(df, results_dir, quantiles, backend, n_workers):
+    # Quantile mode is opt-in; without a grid the stage records that it was skipped
+    if not quantiles:
+        print("Quantile mode is off (see QUANTILE_MODE / --quantiles)")
+        return None
+    neighborhood_module = load_analysis_module('1_neighborhood_analysis.py')
+    amenity_module = load_analysis_module('2_amenity_premium_analysis.py')
+    quantile_results = {
+        'neighborhood': neighborhood_module.analyze_neighborhood_quantiles(df, quantiles, backend, n_workers),
+        'amenity': amenity_module.analyze_amenity_quantiles(amenity_module.extract_amenity_features(working_copy(df)),
+                                                            quantiles, backend, n_workers)
+    }
+    for kind, table in quantile_results.items():
+        if table is None:
+            continue
+        table.to_csv(os.path.join(results_dir, 'quantile_effects', f'{kind}_quantile_premiums.csv'), index=False)
+    return quantile_results
+
+def segment_model_paths(processed_dir):
+    return (os.path.join(processed_dir, os.path.basename(PCA_MODEL_PATH)),
+            os.path.join(processed_dir, os.path.basename(SEGMENT_MODEL_PATH)))
+
+def feature_table_paths(processed_dir):
+    return (os.path.join(processed_dir, os.path.basename(CALENDAR_FEATURES_PATH)),
+            os.path.join(processed_dir, os.path.basename(REVIEWS_FEATURES_PATH)))
+
+def build_listing_features(df, duplicate_clusters, processed_dir, snapshots=None):
+    host_index = build_host_index(df)
+    host_features = compute_host_portfolio_features(df, host_index)
+    listing_host_features = host_features_for_listings(df, host_index, host_features)
+    extra_features = [listing_host_features]
     
-    amenity_module = load_module_from_file('2_amenity_premium_analysis.py', 'amenity_analysis')
-    df_with_amenities = amenity_module.extract_amenity_features(df)
-    amenity_results, amenity_model = amenity_module.analyze_amenity_premiums(df_with_amenities)
+    if duplicate_clusters is not None:
+        extra_features.append(duplicate_clusters[['duplicate_cluster_size']])
     
-    host_module = load_module_from_file('3_host_behavior_analysis.py', 'host_analysis')
-    host_results = host_module.analyze_host_behavior(df)
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        spatial_index = build_spatial_index(df)
+        extra_features.append(compute_spatial_features(df, spatial_index))
     
-    integrated_module = load_module_from_file('4_integrated_model.py', 'integrated_model')
-    integrated_results = integrated_module.build_integrated_price_model(df)
+    calendar_path, review_path = feature_table_paths(processed_dir)
+    calendar_features = load_calendar_features(calendar_path)
+    if calendar_features is not None:
+        # Only the non-price calendar features: the calendar prices are the listing's own price
+        calendar_features = calendar_features[[col for col in CALENDAR_MODEL_FEATURES if col in calendar_features]]
+        extra_features.append(df[['id']].join(calendar_features, on='id').drop(columns=['id']))
     
-    generate_final_report(neighborhood_results, amenity_results, host_results, integrated_results)
+    review_features = load_review_features(review_path)
+    if review_features is not None:
+        extra_features.append(review_features_for_listings(df, review_features))
+    
+    # Price dynamics across the snapshots, as of the analysed one (listed last)
+    if snapshots:
+        panel = build_snapshot_panel(snapshots)
+        features = panel_features(panel, target=panel['paths'].index(snapshots[-1][1]))
+        extra_features.append(df[['id']].join(features, on='id').drop(columns=['id']))
+    
+    # Segment fixed effects, from the models saved by the PCA pipeline
+    pca_model_path, segment_model_path = segment_model_paths(processed_dir)
+    if SEGMENT_FIXED_EFFECTS and os.path.exists(pca_model_path) and os.path.exists(segment_model_path):
+        extra_features.append(segment_features_for_listings(engineer_features(df, spatial_features=False),
+                                                            load_pca_model(pca_model_path),
+                                                            load_segment_model(segment_model_path)))
+    
+    text_matrix = hash_text_features(df) if 'description' in df.columns else None
+    return pd.concat(extra_features, axis=1), text_matrix
+
+def run_integrated_stage(df, listing_features, results_dir, matrix_dir, n_workers, sample_fraction=None,
+                         quantiles=None, quantile_backend=QUANTILE_BACKEND):
+    extra_features, text_matrix = listing_features
+    integrated_module = load_analysis_module('4_integrated_model.py')
+    integrated_results = integrated_module.build_integrated_price_model(
+        df, extra_features=extra_features, text_matrix=text_matrix, cv_folds=CV_FOLDS,
+        regularization=REGULARIZATION_METHOD, importance=FEATURE_IMPORTANCE_METHOD, n_workers=n_workers,
+        results_dir=results_dir, matrix_dir=matrix_dir,
+        quantiles=quantiles, quantile_backend=quantile_backend
+    )
+    if integrated_results['quantile_coefficients'] is not None:
+        integrated_results['quantile_coefficients'].to_csv(
+            os.path.join(results_dir, 'quantile_effects', 'integrated_quantile_coefficients.csv'), index=False)
+    if sample_fraction:
+        integrated_results['coefficients'] = add_premium_bounds(integrated_results['coefficients'], sample_fraction)
+    wait_for_figures()
+    return integrated_results
+
+def run_price_analysis(data_path, results_dir=os.path.join(PIPELINE_DIR, 'results'), processed_dir=PROCESSED_DIR,
+                       stages=PRICE_STAGES,
+                       n_workers=N_WORKERS, checkpoints=None, sample_fraction=SAMPLE_FRACTION, sample_seed=SAMPLE_SEED,
+                       city=CITY, snapshot_date=SNAPSHOT_DATE, record_results=True,
+                       quantiles=QUANTILE_GRID if QUANTILE_MODE else None, quantile_backend=QUANTILE_BACKEND,
+                       sql_backend=SQL_BACKEND, snapshot_paths=SNAPSHOT_PATHS):
+    """
+    Run the price analysis as named stages. With a checkpoint store, every
+    finished stage is saved and a rerun loads it instead of recomputing;
+    stages that are not requested are only run (or loaded) when a requested
+    stage depends on them.
+    sample_fraction: run every stage on a cached stratified sample of this
+    fraction of the listings (by neighborhood x room type), reporting bounds
+    on each premium; results go to a sample_* subdirectory of results_dir
+    record_results: the report stage also writes the result tables to the
+    run history in processed_dir (see src/result_store.py), keyed by city,
+    snapshot date and code version
+    quantiles: grid of log-price quantiles for the quantile stage and the
+    integrated model ('linear' or 'hgb' quantile_backend); None skips them
+    sql_backend: push the host-behavior aggregations into DuckDB over a
+    Parquet copy of data_path (needs the optional duckdb package)
+    snapshot_paths: earlier listings snapshots as (date, path) pairs; the
+    integrated model then gets price momentum, survival and host portfolio
+    growth across them and data_path (see src/snapshot_panel.py)
+    """
+    use_headless_backend()
+    # A sampled run keeps its design matrix and folds apart from the full run's
+    matrix_dir = os.path.join(processed_dir, 'shared_design_matrix')
+    if sample_fraction:
+        results_dir = os.path.join(results_dir, sample_run_name(sample_fraction, sample_seed))
+        matrix_dir = os.path.join(processed_dir, 'samples', sample_run_name(sample_fraction, sample_seed),
+                                  'shared_design_matrix')
+    for subdir in RESULT_SUBDIRS:
+        os.makedirs(os.path.join(results_dir, subdir), exist_ok=True)
+    
+    # The listings stage reads the processed CSV, which the clean stage may have rewritten
+    stage_inputs = {'listings': input_fingerprint([data_path], {'sample_fraction': sample_fraction,
+                                                                'sample_seed': sample_seed})}
+    # Listing features also read the calendar and review feature tables, the PCA
+    # and segment models the PCA pipeline saves, and the earlier snapshots
+    snapshots = None
+    if snapshot_paths:
+        snapshots = list(snapshot_paths) + [(snapshot_date_of(data_path, snapshot_date), data_path)]
+    stage_inputs['listing_features'] = input_fingerprint(
+        list(feature_table_paths(processed_dir)) +
+        (list(segment_model_paths(processed_dir)) if SEGMENT_FIXED_EFFECTS else []) +
+        [path for _, path in snapshots or []], {'calendar_features': CALENDAR_MODEL_FEATURES})
+    if quantiles:
+        stage_inputs['quantile'] = stage_inputs['integrated'] = {'quantiles': sorted(quantiles),
+                                                                 'backend': quantile_backend}
+    declare_dependencies(checkpoints, PRICE_STAGE_DEPENDENCIES)
+    for stage in stage_inputs:
+        invalidate_if_stale(checkpoints, stage, stage_inputs[stage])
+    
+    # The file aggregates only describe the analysed listings when none were sampled or dropped
+    aggregate_source = None
+    if sql_backend:
+        if not sql_backend_available():
+            print("duckdb is not installed - aggregations stay in pandas")
+        elif sample_fraction or DEDUP_NEAR_DUPLICATES:
+            print("Sampled or deduplicated listings differ from the file - aggregations stay in pandas")
+        else:
+            aggregate_source = data_path
+    
+    state = {}
+    # Arguments are only resolved when a stage actually runs, so a stage loaded
+    # from its checkpoint never pulls in its own dependencies
+    stage_calls = {
+        'listings': lambda: prepare_listings(data_path, sample_fraction, sample_seed,
+                                             os.path.join(processed_dir, 'samples')),
+        'neighborhood': lambda: run_neighborhood_stage(get('listings')[0], results_dir, sample_fraction),
+        'amenity': lambda: run_amenity_stage(get('listings')[0], results_dir, sample_fraction),
+        'host': lambda: run_host_stage(get('listings')[0], results_dir, aggregate_source),
+        'quantile': lambda: run_quantile_stage(get('listings')[0], results_dir, quantiles, quantile_backend, n_workers),
+        'listing_features': lambda: build_listing_features(*get('listings'), processed_dir, snapshots),
+        'integrated': lambda: run_integrated_stage(get('listings')[0], get('listing_features'), results_dir,
+                                                   matrix_dir, n_workers, sample_fraction, quantiles,
+                                                   quantile_backend)
+    }
+    
+    def get(stage):
+        if stage not in state:
+            state[stage] = run_stage(checkpoints, stage, stage_calls[stage], inputs=stage_inputs.get(stage))
+        return state[stage]
+    
+    print("="*50)
+    print("RUNNING COMPREHENSIVE PRICE ANALYSIS")
+    print("="*50)
+    
+    for stage in stages:
+        if stage == 'report':
+            generate_final_report(get('neighborhood'), get('amenity'), get('host'), get('integrated'),
+                                  sample_fraction=sample_fraction, quantile_results=get('quantile'))
+            if record_results:
+                settings = {'dedup_near_duplicates': DEDUP_NEAR_DUPLICATES, 'cv_folds': CV_FOLDS,
+                            'regularization': REGULARIZATION_METHOD, 'importance': FEATURE_IMPORTANCE_METHOD,
+                            'sample_seed': sample_seed if sample_fraction else None}
+                record_run(os.path.join(processed_dir, RESULT_STORE_NAME), data_path, get('neighborhood'),
+                           get('amenity'), get('host'), get('integrated'), sample_fraction=sample_fraction,
+                           sample_seed=sample_seed, settings=settings, city=city, snapshot_date=snapshot_date)
+        elif is_complete(checkpoints, stage, stage_inputs.get(stage)):
+            # Finished in an earlier run; only loaded if a later stage needs it
+            print(f"\n[{stage}] already complete")
+        else:
+            get(stage)
     
     print("="*50)
     print("ANALYSIS COMPLETE!")
     print("="*50)
+    return state
+
+def main():
+    run_price_analysis(OUTPUT_PATH3)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
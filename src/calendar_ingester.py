@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import pandas as pd
+from config.config import CALENDAR_PATH, CALENDAR_FEATURES_PATH, CALENDAR_CHUNK_ROWS
+
+SEASONS = {12: 'winter', 1: 'winter', 2: 'winter', 3: 'spring', 4: 'spring', 5: 'spring',
+           6: 'summer', 7: 'summer', 8: 'summer', 9: 'fall', 10: 'fall', 11: 'fall'}
+
+def _aggregate_calendar_chunk(chunk):
+    listing_id = chunk['listing_id'].to_numpy()
+    dates = pd.to_datetime(chunk['date'], format='%Y-%m-%d', errors='coerce')
+    booked = (chunk['available'] == 'f').to_numpy(dtype=float)
+    price = chunk['price'].replace('[\\$,]', '', regex=True).astype(float).to_numpy()
+    has_price = ~np.isnan(price)
+    price = np.where(has_price, price, 0.0)
+
+    # Friday and Saturday nights are the weekend rate
+    weekend = dates.dt.dayofweek.isin([4, 5]).to_numpy()
+    season = dates.dt.month.map(SEASONS).to_numpy()
+
+    sums = {
+        'n_days': np.ones(len(chunk)),
+        'n_booked': booked,
+        'price_sum': price,
+        'price_n': has_price.astype(float),
+        'weekend_price_sum': np.where(weekend, price, 0.0),
+        'weekend_price_n': (weekend & has_price).astype(float),
+        'weekday_price_sum': np.where(~weekend, price, 0.0),
+        'weekday_price_n': (~weekend & has_price).astype(float)
+    }
+    for name in set(SEASONS.values()):
+        in_season = season == name
+        sums[f'{name}_price_sum'] = np.where(in_season, price, 0.0)
+        sums[f'{name}_price_n'] = (in_season & has_price).astype(float)
+
+    return pd.DataFrame(sums).groupby(listing_id).sum()
+
+def ingest_calendar(file_path=CALENDAR_PATH, output_path=CALENDAR_FEATURES_PATH, chunksize=CALENDAR_CHUNK_ROWS):
+    print("Ingesting calendar data")
+
+    totals = None
+    n_rows = 0
+    try:
+        reader = pd.read_csv(file_path, usecols=['listing_id', 'date', 'available', 'price'],
+                             dtype={'listing_id': 'int64', 'available': 'category', 'price': 'object'},
+                             chunksize=chunksize)
+        for chunk in reader:
+            # Only per-listing running sums are kept between chunks
+            chunk_totals = _aggregate_calendar_chunk(chunk)
+            totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+            n_rows += len(chunk)
+            print(f"   Processed {n_rows} calendar rows ({len(totals)} listings)")
+    except FileNotFoundError:
+        print(f"Error: File {file_path} not found!")
+        return None
+
+    if totals is None:
+        print("Calendar file is empty")
+        return None
+
+    features = build_calendar_features(totals)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    features.to_csv(output_path)
+    print(f"Calendar features for {len(features)} listings saved to: {output_path}")
+    return features
+
+def build_calendar_features(totals):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_price = totals['price_sum'] / totals['price_n']
+        weekend_price = totals['weekend_price_sum'] / totals['weekend_price_n']
+        weekday_price = totals['weekday_price_sum'] / totals['weekday_price_n']
+
+        features = pd.DataFrame({
+            'cal_occupancy_rate': totals['n_booked'] / totals['n_days'],
+            'cal_mean_price': mean_price,
+            'cal_weekend_price_premium': weekend_price / weekday_price - 1
+        }, index=totals.index)
+
+        for name in ['winter', 'spring', 'summer', 'fall']:
+            season_price = totals[f'{name}_price_sum'] / totals[f'{name}_price_n']
+            features[f'cal_{name}_price_index'] = season_price / mean_price
+
+    features = features.replace([np.inf, -np.inf], np.nan).astype('float32')
+    features.index.name = 'id'
+    return features
+
+def load_calendar_features(file_path=CALENDAR_FEATURES_PATH):
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_csv(file_path, index_col='id')
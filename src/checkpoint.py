@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+from src.lazy_imports import lazy_import
+
+joblib = lazy_import('joblib')
+
+MANIFEST_NAME = 'manifest.json'
+
+def input_fingerprint(paths, settings=None):
+    # Inputs are identified by path, size and modification time, so a changed
+    # dataset invalidates every checkpoint without hashing gigabytes of CSV
+    entries = []
+    for path in paths:
+        if path is not None and os.path.exists(path):
+            stat = os.stat(path)
+            entries.append([os.path.abspath(path), stat.st_size, int(stat.st_mtime)])
+        else:
+            entries.append([path, None, None])
+    payload = json.dumps({'inputs': entries, 'settings': settings or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _write_json(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+def open_checkpoints(checkpoint_dir, fingerprint, fresh=False):
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest_path = os.path.join(checkpoint_dir, MANIFEST_NAME)
+    manifest = None
+    if os.path.exists(manifest_path) and not fresh:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('fingerprint') != fingerprint:
+            print("Inputs or settings changed since the last run - discarding checkpoints")
+            manifest = None
+
+    if manifest is None:
+        for name in os.listdir(checkpoint_dir):
+            if name.endswith('.joblib'):
+                os.remove(os.path.join(checkpoint_dir, name))
+        manifest = {'fingerprint': fingerprint, 'stages': {}}
+        _write_json(manifest_path, manifest)
+    elif manifest['stages']:
+        print(f"Resuming: completed stages {', '.join(manifest['stages'])}")
+
+    return {'dir': checkpoint_dir, 'manifest_path': manifest_path, 'manifest': manifest}
+
+def is_complete(checkpoints, stage, inputs=None):
+    if checkpoints is None or stage not in checkpoints['manifest']['stages']:
+        return False
+    entry = checkpoints['manifest']['stages'][stage]
+    return entry.get('inputs') == inputs and os.path.exists(os.path.join(checkpoints['dir'], f'{stage}.joblib'))
+
+def declare_dependencies(checkpoints, dependencies):
+    # dependencies: stage -> stages its result is built from. Pipelines sharing
+    # one checkpoint store each declare their own stages
+    if checkpoints is not None:
+        checkpoints.setdefault('dependencies', {}).update(dependencies)
+
+def dependent_stages(checkpoints, stage):
+    # The stage itself and every stage built, directly or not, on its result
+    dependencies = checkpoints.get('dependencies', {})
+    stages = [stage]
+    for name in stages:
+        stages += [other for other, needs in dependencies.items() if name in needs and other not in stages]
+    return stages
+
+def invalidate_from(checkpoints, stage):
+    # Only the stage and the stages that depend on it are discarded; unrelated
+    # checkpoints (e.g. clean/pca next to the price stages) are kept
+    recorded = checkpoints['manifest']['stages']
+    if stage not in recorded:
+        return
+    for name in dependent_stages(checkpoints, stage):
+        if name not in recorded:
+            continue
+        del recorded[name]
+        path = os.path.join(checkpoints['dir'], f'{name}.joblib')
+        if os.path.exists(path):
+            os.remove(path)
+    _write_json(checkpoints['manifest_path'], checkpoints['manifest'])
+
+def invalidate_if_stale(checkpoints, stage, inputs):
+    entry = None if checkpoints is None else checkpoints['manifest']['stages'].get(stage)
+    if entry is not None and entry.get('inputs') != inputs:
+        print(f"Inputs of stage '{stage}' changed - recomputing it and every stage that depends on it")
+        invalidate_from(checkpoints, stage)
+
+def save_checkpoint(checkpoints, stage, result, elapsed, inputs=None):
+    # Write-then-rename: an interrupted save leaves the previous state intact
+    invalidate_from(checkpoints, stage)
+    path = os.path.join(checkpoints['dir'], f'{stage}.joblib')
+    joblib.dump(result, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    checkpoints['manifest']['stages'][stage] = {
+        'inputs': inputs,
+        'seconds': round(elapsed, 2),
+        'finished_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    _write_json(checkpoints['manifest_path'], checkpoints['manifest'])
+
+def load_checkpoint(checkpoints, stage):
+    return joblib.load(os.path.join(checkpoints['dir'], f'{stage}.joblib'))
+
+def run_stage(checkpoints, stage, func, *args, inputs=None):
+    """
+    Return the stage's checkpointed result if it finished in an earlier run
+    with the same inputs, otherwise run func(*args) and checkpoint the result.
+    inputs: optional fingerprint of files the stage reads beyond the run's own
+    inputs (see input_fingerprint)
+    """
+    if is_complete(checkpoints, stage, inputs):
+        print(f"\n[{stage}] loaded from checkpoint")
+        return load_checkpoint(checkpoints, stage)
+
+    print(f"\n[{stage}] running")
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    if checkpoints is not None:
+        save_checkpoint(checkpoints, stage, result, elapsed, inputs)
+    print(f"[{stage}] finished in {elapsed:.1f}s")
+    return result
@@ -0,0 +1,112 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from config.config import COLUMN_SCHEMA_PATH, COERCE_MAX_MISSING
+
+def parse_unique_values(values):
+    """
+    Numeric parse of a column through its unique values only: every distinct
+    string is parsed once, in one vectorized call, and the result is expanded
+    back with the factorize codes. Returns (parsed values, distinct values,
+    distinct values that failed to parse)
+    """
+    codes, uniques = pd.factorize(values)
+    parsed_uniques = pd.to_numeric(pd.Series(uniques, dtype=object), errors='coerce').to_numpy(dtype=float)
+    # Missing entries have code -1 and stay NaN
+    parsed = np.append(parsed_uniques, np.nan)[codes]
+    return parsed, np.asarray(uniques), np.asarray(uniques)[np.isnan(parsed_uniques)]
+
+def classify_column(values, max_missing=COERCE_MAX_MISSING):
+    """
+    Coercion decision for one column: 'numeric' (used as is), 'coerce'
+    (parsed to numbers, unparseable values filled with the median) or 'drop'
+    (more than max_missing of it missing after parsing)
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return {'kind': 'numeric', 'dtype': str(values.dtype)}, None
+    parsed, _, failed = parse_unique_values(values)
+    missing_share = float(np.isnan(parsed).mean()) if len(parsed) else 1.0
+    decision = {
+        'kind': 'drop' if missing_share > max_missing else 'coerce',
+        'dtype': str(values.dtype),
+        'missing_share': round(missing_share, 4),
+        'non_numeric_samples': [str(value) for value in failed[:5]]
+    }
+    return decision, parsed
+
+def infer_column_types(data, max_missing=COERCE_MAX_MISSING):
+    return {col: classify_column(data[col], max_missing)[0] for col in data.columns}
+
+def load_column_schema(file_path=COLUMN_SCHEMA_PATH):
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_column_schema(schema, file_path=COLUMN_SCHEMA_PATH):
+    if os.path.dirname(file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(schema, f, indent=2)
+    os.replace(temp_path, file_path)
+    print(f"Column schema saved to: {file_path}")
+
+def coerce_columns(data, schema=None, schema_path=COLUMN_SCHEMA_PATH, max_missing=COERCE_MAX_MISSING):
+    """
+    Apply per-column coercion decisions in one bulk step. Decisions come from
+    schema, else from the schema cached at schema_path, else they are
+    inferred here and cached there. A column whose observed kind no longer
+    matches its cached decision (e.g. a numeric column that now holds text in
+    a new snapshot) is reported as drift; the cached decision is still
+    applied, so every snapshot gets the same features.
+    Returns (coerced frame, schema, drift table)
+    """
+    if schema is None and schema_path is not None:
+        schema = load_column_schema(schema_path)
+    cached = schema is not None
+    schema = dict(schema or {})
+
+    drift = []
+    added = False
+    parsed_columns = {}
+    for col in data.columns:
+        decision, parsed = classify_column(data[col], max_missing)
+        if parsed is not None:
+            parsed_columns[col] = parsed
+        if col not in schema:
+            schema[col] = decision
+            added = True
+            if cached:
+                drift.append({'column': col, 'cached': 'new', 'observed': decision['kind']})
+        elif schema[col]['kind'] != decision['kind']:
+            drift.append({'column': col, 'cached': schema[col]['kind'], 'observed': decision['kind']})
+    for col in schema:
+        if col not in data.columns:
+            drift.append({'column': col, 'cached': schema[col]['kind'], 'observed': 'absent'})
+    drift = pd.DataFrame(drift, columns=['column', 'cached', 'observed'])
+
+    if len(drift):
+        print(f"Schema drift in {len(drift)} columns (cached decisions kept):")
+        for _, row in drift.iterrows():
+            print(f"  {row['column']}: cached {row['cached']}, observed {row['observed']}")
+    # New columns are decided once and cached with the rest
+    if added and schema_path is not None:
+        save_column_schema(schema, schema_path)
+
+    drop_columns = [col for col in data.columns if schema[col]['kind'] == 'drop']
+    coerce = [col for col in data.columns if schema[col]['kind'] == 'coerce']
+    # A cached 'numeric' column that arrives as text is coerced like the others
+    coerce += [col for col in data.columns if schema[col]['kind'] == 'numeric' and col in parsed_columns]
+    if drop_columns:
+        print(f"Dropping {len(drop_columns)} columns with too many non-numeric values: {drop_columns}")
+
+    coerced = data.drop(columns=drop_columns)
+    if coerce:
+        print(f"Coercing {len(coerce)} columns to numeric: {coerce}")
+        block = pd.DataFrame({col: parsed_columns.get(col, data[col]) for col in coerce}, index=data.index,
+                             dtype=float)
+        coerced[coerce] = block.fillna(block.median())
+    return coerced, schema, drift
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+from config.config import CV_FOLDS, N_WORKERS
+from src.lazy_imports import lazy_import
+from src.shared_matrix import run_on_shared_matrix, weighted_normal_equations
+
+ensemble = lazy_import('sklearn.ensemble')
+
+def make_fold_indices(n_rows, n_folds=CV_FOLDS, groups=None, random_state=42):
+    if groups is None:
+        rng = np.random.default_rng(random_state)
+        folds = np.arange(n_rows) % n_folds
+        rng.shuffle(folds)
+        return folds.astype(np.int16)
+
+    # Grouped folds: whole groups go to the currently lightest fold, largest first
+    codes, _ = pd.factorize(np.asarray(groups))
+    group_sizes = np.bincount(codes[codes >= 0])
+    group_fold = np.empty(len(group_sizes), dtype=np.int16)
+    fold_sizes = np.zeros(n_folds, dtype=np.int64)
+    for group in np.argsort(group_sizes, kind='stable')[::-1]:
+        fold = np.argmin(fold_sizes)
+        group_fold[group] = fold
+        fold_sizes[fold] += group_sizes[group]
+    return np.where(codes >= 0, group_fold[np.clip(codes, 0, None)], -1).astype(np.int16)
+
+def get_fold_indices(meta, name, n_folds=CV_FOLDS, groups=None, random_state=42):
+    # Folds are cached next to the shared matrix, so repeated runs and every
+    # backend see exactly the same splits
+    fold_path = os.path.join(meta['output_dir'], f'folds_{name}_{n_folds}.npy')
+    if os.path.exists(fold_path):
+        folds = np.load(fold_path)
+        if len(folds) == meta['shape'][0]:
+            return folds, fold_path
+    folds = make_fold_indices(meta['shape'][0], n_folds, groups, random_state)
+    np.save(fold_path, folds)
+    return folds, fold_path
+
+def _fit_fold(matrix, task):
+    backend, fold, fold_path = task
+    X, y = matrix['X'], matrix['y']
+    folds = np.load(fold_path, mmap_mode='r')
+    test_rows = np.flatnonzero(folds == fold)
+    train_mask = (folds != fold) & (folds >= 0)
+
+    if backend == 'ols':
+        # 0/1 weights select the training rows without materialising them
+        gram, xty = weighted_normal_equations(X, y, train_mask.astype(float))
+        beta = np.linalg.lstsq(gram, xty, rcond=None)[0]
+        predictions = X[test_rows] @ beta
+    elif backend == 'rf':
+        feature_cols = [j for j, col in enumerate(matrix['columns']) if col != 'const']
+        train_rows = np.flatnonzero(train_mask)
+        rf = ensemble.RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1)
+        rf.fit(X[train_rows][:, feature_cols], y[train_rows])
+        predictions = rf.predict(X[test_rows][:, feature_cols])
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    return backend, test_rows, predictions
+
+def regression_metrics(y_true, y_pred):
+    residuals = y_true - y_pred
+    return {
+        'rmse': np.sqrt(np.mean(residuals ** 2)),
+        'mae': np.mean(np.abs(residuals)),
+        'r2': 1 - np.sum(residuals ** 2) / np.sum((y_true - y_true.mean()) ** 2)
+    }
+
+def cross_validate_shared_matrix(meta, groups=None, n_folds=CV_FOLDS, backends=('ols', 'rf'),
+                                 n_workers=N_WORKERS, random_state=42):
+    if n_folds < 2:
+        raise ValueError(f"Cross-validation needs at least 2 folds, got {n_folds}")
+    scheme = 'grouped' if groups is not None else 'kfold'
+    print(f"Cross-validating ({scheme}, {n_folds} folds, backends: {', '.join(backends)})")
+
+    _, fold_path = get_fold_indices(meta, scheme, n_folds, groups, random_state)
+    tasks = [(backend, fold, fold_path) for backend in backends for fold in range(n_folds)]
+    fold_results = run_on_shared_matrix(_fit_fold, tasks, meta, n_workers=n_workers)
+
+    y = np.load(os.path.join(meta['output_dir'], 'y.npy'))
+    rows = []
+    for backend in backends:
+        oof = np.full(len(y), np.nan)
+        for result_backend, test_rows, predictions in fold_results:
+            if result_backend == backend:
+                oof[test_rows] = predictions
+        scored = ~np.isnan(oof)
+        metrics = regression_metrics(y[scored], oof[scored])
+        rows.append({'scheme': scheme, 'backend': backend, 'n_folds': n_folds, **metrics})
+        print(f"   {backend}: out-of-fold RMSE={metrics['rmse']:.3f}, MAE={metrics['mae']:.3f}, R²={metrics['r2']:.3f}")
+
+    return pd.DataFrame(rows)
@@ -1,13 +1,16 @@
 import pandas as pd
 import numpy as np
 from config.config import PRICE_COLUMNS, DATE_COLUMNS
-from sklearn.impute import SimpleImputer
+from src.lazy_imports import lazy_import
+from src.memory import working_copy
 import warnings
 warnings.filterwarnings('ignore')
 
+impute = lazy_import('sklearn.impute')
+
 def clean_data(df):
     print("Cleaning data")
-    df_clean = df.copy()
+    df_clean = working_copy(df)
     
     for col in PRICE_COLUMNS:
         if col in df_clean.columns:
@@ -32,7 +35,7 @@ def clean_data(df):
 
 def handle_missing_values(df):
     print("Handling missing values")
-    df_filled = df.copy()
+    df_filled = working_copy(df)
     
     print("\n=== ANALYZING MISSINGNESS ===")
     missing_percent = (df_filled.isnull().sum() / len(df_filled)) * 100
@@ -56,9 +59,11 @@ def handle_missing_values(df):
     print("\n=== TIER 1: DROPPING HIGH MISSING COLUMNS (>40%) ===")
     for col, percent in high_missing.items():
         if col in df_filled.columns:
-            df_filled = df_filled.drop(columns=[col])
             columns_dropped.append((col, percent))
             print(f"   DROPPED: {col} ({percent:.1f}% missing)")
+    # One drop for all of them rather than a new frame per column
+    if columns_dropped:
+        df_filled = df_filled.drop(columns=[col for col, _ in columns_dropped])
     
     print(f"   Total columns dropped: {len(columns_dropped)}")
     
@@ -100,7 +105,7 @@ def handle_missing_values(df):
     
     if numeric_cols_to_impute:
         pre_impute_missing = df_filled[numeric_cols_to_impute].isnull().sum().sum()
-        numeric_imputer = SimpleImputer(strategy='median')
+        numeric_imputer = impute.SimpleImputer(strategy='median')
         df_filled[numeric_cols_to_impute] = numeric_imputer.fit_transform(df_filled[numeric_cols_to_impute])
         total_numeric_values_filled += pre_impute_missing
         numeric_cols_imputed.extend(numeric_cols_to_impute)
@@ -1,21 +1,18 @@
 import pandas as pd
 import numpy as np
+from src.column_types import parse_unique_values
 
 def check_non_numeric_values(df, max_samples=5):
     print("\nChecking for non-numeric values in PCA data")
     
     for col in df.columns:
-        if df[col].dtype == 'object':
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            # Every distinct value is parsed once, vectorized, instead of float() per value
+            _, uniques, non_numeric = parse_unique_values(df[col])
             print(f"\nColumn '{col}':")
             print(f"Data type: {df[col].dtype}")
-            print(f"Unique values sample: {df[col].unique()[:max_samples]}")
+            print(f"Unique values sample: {uniques[:max_samples]}")
             
-            non_numeric_samples = []
-            for val in df[col].dropna().unique()[:max_samples]:
-                try:
-                    float(val)
-                except (ValueError, TypeError):
-                    non_numeric_samples.append(val)
-            
-            if non_numeric_samples:
-                print(f"Non-numeric samples: {non_numeric_samples}")
\ No newline at end of file
+            if len(non_numeric):
+                print(f"Non-numeric samples: {list(non_numeric[:max_samples])} "
+                      f"({len(non_numeric)} of {len(uniques)} unique values)")
@@ -1,16 +1,24 @@
 import pandas as pd
 from config.config import BINARY_FEATURES
+from src.spatial_index import add_spatial_features
+from src.memory import working_copy, dummy_block
 
-def engineer_features(df):
+def engineer_features(df, spatial_features=True, feature_tables=None):
     print("Engineering features")
-    df_fe = df.copy()
+    df_fe = working_copy(df)
+    
+    # Per-listing tables indexed by listing id (e.g. calendar features)
+    for table in feature_tables or []:
+        if 'id' in df_fe.columns:
+            df_fe = df_fe.join(table, on='id')
+            print(f"Joined {table.shape[1]} features for {df_fe[table.columns[0]].notna().sum()} listings")
     
     for feature in BINARY_FEATURES:
         if feature in df_fe.columns:
             df_fe[feature] = df_fe[feature].map({'t': 1, 'f': 0}).fillna(0)
     
     if 'room_type' in df_fe.columns:
-        room_type_dummies = pd.get_dummies(df_fe['room_type'], prefix='room_type')
+        room_type_dummies = dummy_block(df_fe['room_type'], 'room_type')
         df_fe = pd.concat([df_fe, room_type_dummies], axis=1)
     
     if 'neighbourhood_cleansed' in df_fe.columns:
@@ -18,12 +26,15 @@ def engineer_features(df):
         df_fe['neighbourhood_group'] = df_fe['neighbourhood_cleansed'].apply(
             lambda x: x if x in top_neighborhoods else 'Other'
         )
-        neighborhood_dummies = pd.get_dummies(df_fe['neighbourhood_group'], prefix='neighborhood')
+        neighborhood_dummies = dummy_block(df_fe['neighbourhood_group'], 'neighborhood')
         df_fe = pd.concat([df_fe, neighborhood_dummies], axis=1)
     
     if all(col in df_fe.columns for col in ['price', 'bedrooms']):
         df_fe['price_per_bedroom'] = df_fe['price'] / df_fe['bedrooms'].replace(0, 1)
     
+    if spatial_features and all(col in df_fe.columns for col in ['latitude', 'longitude', 'price']):
+        df_fe = add_spatial_features(df_fe)
+    
     print("Feature engineering completed")
     return df_fe
 
@@ -52,7 +63,7 @@ def select_pca_features(df):
     
     pca_features = [feature for feature in pca_features if feature in df.columns]
     
-    pca_df = df[pca_features].copy()
+    pca_df = working_copy(df[pca_features])
     
     print(f"Selected {len(pca_features)} features for PCA")
     return pca_df, pca_features
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import json
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from config.config import FIGURE_DPI, FIGURE_WORKERS, FIGURE_MAX_FLIERS
+
+_EXECUTOR = None
+_PENDING = []
+_RENDERED = []
+_SKIPPED = []
+
+def boxplot_summary(df, x, y, max_fliers=FIGURE_MAX_FLIERS):
+    # Quartiles, Tukey whiskers and a capped set of outliers per group: enough
+    # for matplotlib's bxp to draw the same box plot without the raw rows
+    data = df[[x, y]].dropna()
+    grouped = data.groupby(x, sort=True)[y]
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    low_fence = data[x].map(quartiles[0.25] - 1.5 * iqr)
+    high_fence = data[x].map(quartiles[0.75] + 1.5 * iqr)
+    inside = (data[y] >= low_fence) & (data[y] <= high_fence)
+    whiskers = data[inside].groupby(x, sort=True)[y].agg(['min', 'max'])
+    outliers = data.loc[~inside]
+
+    stats = []
+    for group in quartiles.index:
+        fliers = np.sort(outliers.loc[outliers[x] == group, y].to_numpy(dtype=float))
+        if len(fliers) > max_fliers:
+            # Evenly spaced order statistics keep the extremes and the shape of the tail
+            fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).round().astype(int)]
+        stats.append({
+            'label': str(group),
+            'q1': float(quartiles.loc[group, 0.25]),
+            'med': float(quartiles.loc[group, 0.5]),
+            'q3': float(quartiles.loc[group, 0.75]),
+            'whislo': float(whiskers.loc[group, 'min']),
+            'whishi': float(whiskers.loc[group, 'max']),
+            'fliers': fliers.tolist()
+        })
+    return stats
+
+def box_panel(stats, title, xlabel='', ylabel=''):
+    return {'kind': 'box', 'stats': stats, 'title': title, 'xlabel': xlabel, 'ylabel': ylabel}
+
+def barh_panel(labels, values, title, xlabel='', ylabel='', top_down=False):
+    # top_down draws the first label at the top, as seaborn's barplot does
+    return {'kind': 'barh', 'labels': [str(label) for label in labels],
+            'values': [float(value) for value in values], 'title': title,
+            'xlabel': xlabel, 'ylabel': ylabel, 'top_down': top_down}
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def figure_digest(spec):
+    payload = json.dumps(spec, sort_keys=True, default=_to_builtin)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _digest_path(path):
+    return path + '.sha256'
+
+def _is_current(path, digest):
+    if not os.path.exists(path) or not os.path.exists(_digest_path(path)):
+        return False
+    with open(_digest_path(path)) as f:
+        return f.read().strip() == digest
+
+def _draw_panel(ax, panel):
+    if panel['kind'] == 'box':
+        ax.bxp(panel['stats'], showfliers=True, patch_artist=True, widths=0.6,
+               boxprops={'facecolor': '#8fb3d9'}, medianprops={'color': 'black'},
+               flierprops={'marker': 'd', 'markersize': 3})
+    elif panel['kind'] == 'barh':
+        ax.barh(panel['labels'], panel['values'])
+        if panel['top_down']:
+            ax.invert_yaxis()
+    else:
+        raise ValueError(f"Unknown panel kind: {panel['kind']}")
+    ax.set_title(panel['title'])
+    ax.set_xlabel(panel['xlabel'])
+    ax.set_ylabel(panel['ylabel'])
+
+def _render(spec, digest):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    rows, cols = spec['layout']
+    fig, axes = plt.subplots(rows, cols, figsize=spec['figsize'], squeeze=False)
+    for ax, panel in zip(axes.ravel(), spec['panels']):
+        _draw_panel(ax, panel)
+    fig.tight_layout()
+    fig.savefig(spec['path'], dpi=spec['dpi'], bbox_inches='tight')
+    plt.close(fig)
+
+    # Written only after a successful save, so a crash never leaves a stale match
+    with open(_digest_path(spec['path']), 'w') as f:
+        f.write(digest)
+    return spec['path']
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ProcessPoolExecutor(max_workers=FIGURE_WORKERS)
+    return _EXECUTOR
+
+def render_figure(path, panels, layout=(1, 1), figsize=(12, 8), dpi=FIGURE_DPI):
+    spec = {'path': path, 'panels': panels, 'layout': list(layout), 'figsize': list(figsize), 'dpi': dpi}
+    digest = figure_digest(spec)
+    if _is_current(path, digest):
+        _SKIPPED.append(path)
+        return None
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if not FIGURE_WORKERS:
+        _RENDERED.append(_render(spec, digest))
+        return None
+    future = _get_executor().submit(_render, spec, digest)
+    _PENDING.append(future)
+    return future
+
+def wait_for_figures():
+    global _EXECUTOR
+    rendered = _RENDERED + [future.result() for future in _PENDING]
+    skipped = list(_SKIPPED)
+    for pending in (_PENDING, _RENDERED, _SKIPPED):
+        pending.clear()
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=True)
+        _EXECUTOR = None
+    print(f"Figures rendered: {len(rendered)}, unchanged and skipped: {len(skipped)}")
+    return {'rendered': rendered, 'skipped': skipped}
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from config.config import GROUPED_MIN_LISTINGS, SHARED_MATRIX_CHUNK_ROWS
+from src.lazy_imports import lazy_import
+
+sparse = lazy_import('scipy.sparse')
+stats = lazy_import('scipy.stats')
+
+def grouped_sufficient_statistics(X, y, codes, n_groups, chunk_rows=SHARED_MATRIX_CHUNK_ROWS):
+    # Per-group X'X, X'y, y'y and counts from one pass: a sparse group
+    # indicator times the row-wise outer products, accumulated in row chunks
+    p = X.shape[1]
+    gram = np.zeros((n_groups, p * p))
+    xty = np.zeros((n_groups, p))
+    yty = np.zeros(n_groups)
+    for start in range(0, len(y), chunk_rows):
+        Xc, yc, gc = X[start:start + chunk_rows], y[start:start + chunk_rows], codes[start:start + chunk_rows]
+        indicator = sparse.csr_matrix((np.ones(len(gc)), (gc, np.arange(len(gc)))), shape=(n_groups, len(gc)))
+        gram += indicator @ (Xc[:, :, None] * Xc[:, None, :]).reshape(len(gc), p * p)
+        xty += indicator @ (Xc * yc[:, None])
+        yty += indicator @ (yc ** 2)
+    counts = np.bincount(codes, minlength=n_groups)
+    return gram.reshape(n_groups, p, p), xty, yty, counts
+
+def fit_grouped_ols(df, features, group_col='neighbourhood_cleansed', target='price', log_target=True,
+                    min_group_size=GROUPED_MIN_LISTINGS):
+    print(f"=== GROUPED OLS BY {group_col.upper()} ===")
+
+    y = pd.to_numeric(df[target], errors='coerce').to_numpy(dtype=float)
+    if log_target:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(y)
+    valid = np.isfinite(y) & df[group_col].notna().to_numpy()
+    for col in features:
+        valid &= df[col].notna().to_numpy()
+
+    codes, group_names = pd.factorize(df[group_col].to_numpy()[valid])
+    counts = np.bincount(codes, minlength=len(group_names))
+    keep_groups = counts >= min_group_size
+    row_keep = keep_groups[codes]
+
+    group_map = np.cumsum(keep_groups) - 1
+    codes = group_map[codes[row_keep]]
+    group_names = np.asarray(group_names)[keep_groups]
+    n_groups = len(group_names)
+    print(f"Fitting {n_groups} groups with >= {min_group_size} listings "
+          f"({(~keep_groups).sum()} smaller groups skipped)")
+
+    rows = np.flatnonzero(valid)[row_keep]
+    X = np.column_stack([np.ones(len(rows))] + [df[col].to_numpy()[rows].astype(float) for col in features])
+    y = y[rows]
+    columns = ['const'] + list(features)
+
+    gram, xty, yty, n_obs = grouped_sufficient_statistics(X, y, codes, n_groups)
+
+    # Batched solves across all groups; pinv tolerates features that are constant within a group
+    gram_inv = np.linalg.pinv(gram, hermitian=True)
+    beta = np.einsum('gij,gj->gi', gram_inv, xty)
+    sse = yty - 2 * np.einsum('gi,gi->g', beta, xty) + np.einsum('gi,gij,gj->g', beta, gram, beta)
+    rank = np.linalg.matrix_rank(gram, hermitian=True)
+    dof = np.maximum(n_obs - rank, 1)
+    sigma2 = np.clip(sse, 0, None) / dof
+    std_err = np.sqrt(np.clip(np.diagonal(gram_inv, axis1=1, axis2=2), 0, None) * sigma2[:, None])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stat = np.where(std_err > 0, beta / std_err, np.nan)
+    p_value = 2 * stats.t.sf(np.abs(t_stat), dof[:, None])
+
+    coefficients = pd.DataFrame({
+        'group': np.repeat(group_names, len(columns)),
+        'feature': np.tile(columns, n_groups),
+        'coefficient': beta.ravel(),
+        'std_error': std_err.ravel(),
+        't_stat': t_stat.ravel(),
+        'p_value': p_value.ravel(),
+        'n_obs': np.repeat(n_obs, len(columns))
+    })
+    coefficients['premium_percent'] = (np.exp(coefficients['coefficient']) - 1) * 100
+    coefficients['significant'] = coefficients['p_value'] < 0.05
+    return coefficients
@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+
+def build_host_index(df, host_col='host_id'):
+    print("Building host index")
+
+    codes, host_ids = pd.factorize(df[host_col], sort=True)
+    valid = codes >= 0
+
+    # CSR layout: positions of host k's listings are positions[indptr[k]:indptr[k+1]]
+    order = np.argsort(codes[valid], kind='stable')
+    positions = np.flatnonzero(valid)[order]
+    counts = np.bincount(codes[valid], minlength=len(host_ids))
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    print(f"Indexed {valid.sum()} listings across {len(host_ids)} hosts")
+    return {
+        'host_ids': pd.Index(host_ids),
+        'codes': codes,
+        'positions': positions,
+        'indptr': indptr,
+        'counts': counts
+    }
+
+def get_host_listings(host_index, host_id):
+    loc = host_index['host_ids'].get_indexer([host_id])[0]
+    if loc < 0:
+        return np.array([], dtype=np.intp)
+    return host_index['positions'][host_index['indptr'][loc]:host_index['indptr'][loc + 1]]
+
+def _host_price_sums(df, host_index, price_col):
+    # Per-host count, sum and sum of squares of price, and each listing's own
+    # price (0 where missing)
+    codes = host_index['codes']
+    valid = codes >= 0
+    n_hosts = len(host_index['host_ids'])
+    price = pd.to_numeric(df[price_col], errors='coerce').to_numpy(dtype=float)
+    has_price = ~np.isnan(price)
+    price = np.where(has_price, price, 0.0)
+
+    n = np.bincount(codes[valid], weights=has_price[valid].astype(float), minlength=n_hosts)
+    total = np.bincount(codes[valid], weights=price[valid], minlength=n_hosts)
+    total_sq = np.bincount(codes[valid], weights=price[valid] ** 2, minlength=n_hosts)
+    return price, n, total, total_sq
+
+def _price_dispersion(n, total, total_sq):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+        var = (total_sq - n * mean ** 2) / (n - 1)
+        std = np.sqrt(np.clip(var, 0, None))
+        std = np.where(n > 1, std, 0.0)
+        cv = np.where(mean > 0, std / mean, 0.0)
+    return std, cv
+
+def compute_host_portfolio_features(df, host_index, neighbourhood_col='neighbourhood_cleansed', price_col='price'):
+    print("Computing host portfolio features")
+
+    codes = host_index['codes']
+    valid = codes >= 0
+    host_codes = codes[valid]
+    n_hosts = len(host_index['host_ids'])
+    counts = host_index['counts'].astype(float)
+
+    features = pd.DataFrame({'host_listing_count': host_index['counts']}, index=host_index['host_ids'])
+
+    if neighbourhood_col in df.columns:
+        nb_codes, nb_names = pd.factorize(df[neighbourhood_col])
+        nb_codes = nb_codes[valid]
+        # Count listings per (host, neighbourhood) pair without materialising a host x neighbourhood table
+        pair_keys = host_codes.astype(np.int64) * (len(nb_names) + 1) + (nb_codes + 1)
+        unique_pairs, pair_counts = np.unique(pair_keys, return_counts=True)
+        pair_hosts = unique_pairs // (len(nb_names) + 1)
+
+        features['host_neighbourhoods_spanned'] = np.bincount(pair_hosts, minlength=n_hosts)
+        shares = pair_counts / counts[pair_hosts]
+        features['host_neighbourhood_hhi'] = np.bincount(pair_hosts, weights=shares ** 2, minlength=n_hosts)
+
+    if price_col in df.columns:
+        _, n, total, total_sq = _host_price_sums(df, host_index, price_col)
+        features['host_price_std'], features['host_price_cv'] = _price_dispersion(n, total, total_sq)
+
+    features.index.name = 'host_id'
+    print(f"Computed {features.shape[1]} portfolio features for {len(features)} hosts")
+    return features
+
+def host_features_for_listings(df, host_index, host_features, price_col='price'):
+    codes = host_index['codes']
+    values = host_features.to_numpy(dtype=float)
+
+    # Row-aligned lookup by factorized code; listings without a host_id get NaN
+    listing_values = np.full((len(codes), values.shape[1]), np.nan)
+    valid = codes >= 0
+    listing_values[valid] = values[codes[valid]]
+    listing_features = pd.DataFrame(listing_values, columns=host_features.columns, index=df.index)
+
+    # These feed price models, so price dispersion leaves the listing's own
+    # price out of its host's totals; host_features keeps all listings
+    if 'host_price_std' in host_features.columns and price_col in df.columns:
+        price, n, total, total_sq = _host_price_sums(df, host_index, price_col)
+        own = ~np.isnan(pd.to_numeric(df[price_col], errors='coerce').to_numpy(dtype=float))
+        host = codes[valid]
+        std, cv = _price_dispersion(n[host] - own[valid], total[host] - price[valid],
+                                    total_sq[host] - price[valid] ** 2)
+        listing_features.loc[valid, 'host_price_std'] = std
+        listing_features.loc[valid, 'host_price_cv'] = cv
+
+    return listing_features
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from config.config import (HYPOTHESIS_PERMUTATIONS, PERMUTATION_BATCH_SIZE, LOW_MEMORY_PERMUTATION_BATCH_SIZE,
+                           FDR_ALPHA)
+from src.lazy_imports import lazy_import
+from src.memory import low_memory_enabled
+
+stats = lazy_import('scipy.stats')
+
+def benjamini_hochberg(p_values):
+    p_values = np.asarray(p_values, dtype=float)
+    q_values = np.full(len(p_values), np.nan)
+    tested = ~np.isnan(p_values)
+    p = p_values[tested]
+    if len(p) == 0:
+        return q_values
+    order = np.argsort(p)
+    ranked = p[order] * len(p) / np.arange(1, len(p) + 1)
+    # Step-up: enforce monotonicity from the largest p-value down
+    adjusted = np.minimum.accumulate(ranked[::-1])[::-1].clip(max=1.0)
+    q = np.empty(len(p))
+    q[order] = adjusted
+    q_values[tested] = q
+    return q_values
+
+def _grouped_welch(values, codes, flags, n_cells, n_batches=1):
+    # codes/flags may be (n_batches, n) stacks; one bincount covers every batch
+    keys = (np.arange(n_batches)[:, None] * n_cells + codes) * 2 + flags
+    size = n_batches * n_cells * 2
+    tiled = np.broadcast_to(values, keys.shape).ravel()
+    n = np.bincount(keys.ravel(), minlength=size).reshape(n_batches, n_cells, 2)
+    total = np.bincount(keys.ravel(), weights=tiled, minlength=size).reshape(n_batches, n_cells, 2)
+    total_sq = np.bincount(keys.ravel(), weights=tiled ** 2, minlength=size).reshape(n_batches, n_cells, 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        var = (total_sq - n * mean ** 2) / (n - 1)
+        se2 = var / n
+        t_stat = (mean[..., 1] - mean[..., 0]) / np.sqrt(se2[..., 1] + se2[..., 0])
+        dof = (se2[..., 1] + se2[..., 0]) ** 2 / (se2[..., 1] ** 2 / (n[..., 1] - 1) + se2[..., 0] ** 2 / (n[..., 0] - 1))
+    return n, mean, t_stat, dof
+
+def grouped_welch_tests(df, flag_col='is_professional_host', value_col='price',
+                        group_cols=('neighbourhood_cleansed', 'room_type'), log_values=False,
+                        n_permutations=HYPOTHESIS_PERMUTATIONS, batch_size=PERMUTATION_BATCH_SIZE,
+                        min_group_size=5, alpha=FDR_ALPHA, random_state=42):
+    print(f"=== GROUPED {flag_col.upper()} PRICE TESTS BY {' x '.join(group_cols).upper()} ===")
+    group_cols = list(group_cols)
+
+    values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=float)
+    if log_values:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.log(values)
+    valid = np.isfinite(values) & df[flag_col].notna().to_numpy() & df[group_cols].notna().all(axis=1).to_numpy()
+
+    cells = df.loc[valid, group_cols]
+    codes, cell_index = pd.MultiIndex.from_frame(cells).factorize()
+    values = values[valid]
+    flags = df[flag_col].to_numpy()[valid].astype(bool).astype(np.int64)
+    n_cells = len(cell_index)
+
+    n, mean, t_stat, dof = (arr[0] for arr in _grouped_welch(values, codes, flags, n_cells))
+    testable = (n.min(axis=1) >= min_group_size) & np.isfinite(t_stat)
+    p_welch = np.where(testable, 2 * stats.t.sf(np.abs(t_stat), dof), np.nan)
+
+    # Permutation test: shuffle the flag within each cell, B resamples per batch,
+    # by sorting rows on (cell, random key) and laying the cell's labels back down
+    rng = np.random.default_rng(random_state)
+    if low_memory_enabled():
+        # Each batch holds several (batch, n_rows) arrays; the random stream is
+        # consumed in order, so smaller batches give the same p-values
+        batch_size = min(batch_size, LOW_MEMORY_PERMUTATION_BATCH_SIZE)
+    group_order = np.argsort(codes, kind='stable')
+    labels_in_group_order = flags[group_order]
+    exceed = np.zeros(n_cells)
+    done = 0
+    while done < n_permutations:
+        batch = min(batch_size, n_permutations - done)
+        # Integer cell code plus a uniform [0, 1) key sorts by cell, randomly within cell
+        order = np.argsort(codes[None, :] + rng.random((batch, len(codes))), axis=1)
+        permuted = np.empty((batch, len(codes)), dtype=np.int64)
+        np.put_along_axis(permuted, order, np.broadcast_to(labels_in_group_order, order.shape), axis=1)
+        _, _, t_perm, _ = _grouped_welch(values, codes, permuted, n_cells, batch)
+        exceed += (np.abs(t_perm) >= np.abs(t_stat)[None, :]).sum(axis=0)
+        done += batch
+    p_perm = np.where(testable, (exceed + 1) / (n_permutations + 1), np.nan)
+
+    results = pd.DataFrame(list(cell_index), columns=group_cols)
+    results['n_flagged'] = n[:, 1]
+    results['n_other'] = n[:, 0]
+    results['mean_flagged'] = mean[:, 1]
+    results['mean_other'] = mean[:, 0]
+    results['difference'] = mean[:, 1] - mean[:, 0]
+    results['t_statistic'] = np.where(testable, t_stat, np.nan)
+    results['df'] = np.where(testable, dof, np.nan)
+    results['p_welch'] = p_welch
+    results['p_permutation'] = p_perm
+    results['q_welch'] = benjamini_hochberg(p_welch)
+    results['q_permutation'] = benjamini_hochberg(p_perm)
+    results['significant'] = results['q_welch'] < alpha
+
+    print(f"Tested {testable.sum()} of {n_cells} cells ({n_permutations} permutations each)")
+    print(f"Significant after Benjamini-Hochberg (q < {alpha}): {results['significant'].sum()}")
+    return results
@@ -0,0 +1,40 @@
+import os
+import sys
+import types
+import importlib
+
+class LazyModule(types.ModuleType):
+    # Stands in for a heavy module and imports it on first attribute access,
+    # so a stage only pays for the libraries it actually touches
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            if 'matplotlib' in self.__name__ or 'seaborn' in self.__name__:
+                use_headless_backend()
+            self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+def lazy_import(name):
+    # Already-imported modules are returned as-is
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+def use_headless_backend():
+    # Batch runs never open windows; Agg also avoids importing a GUI toolkit.
+    # An explicit MPLBACKEND set by the user still wins.
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    if 'matplotlib' in sys.modules:
+        sys.modules['matplotlib'].use(os.environ['MPLBACKEND'])
+
+def loaded_heavy_modules(names=('scipy', 'sklearn', 'statsmodels', 'matplotlib', 'seaborn', 'joblib')):
+    return [name for name in names if name in sys.modules]
@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from config.config import LOW_MEMORY
+
+PANDAS_VERSION = tuple(int(part) for part in pd.__version__.split('.')[:2])
+
+_SETTINGS = {'low_memory': False}
+
+def set_low_memory(enabled=True):
+    # Shallow working copies are only safe under copy-on-write, where the first
+    # write to a column copies that column instead of changing the caller's frame
+    if enabled and PANDAS_VERSION < (2, 0):
+        print(f"pandas {pd.__version__} has no copy-on-write - low-memory mode stays off")
+        enabled = False
+    if enabled and PANDAS_VERSION < (3, 0):
+        # Always on from pandas 3, where the option is deprecated
+        pd.set_option('mode.copy_on_write', True)
+    _SETTINGS['low_memory'] = enabled
+    return enabled
+
+def low_memory_enabled():
+    return _SETTINGS['low_memory']
+
+def working_copy(df):
+    # Stands in for df.copy() wherever a function only adds or replaces columns
+    if _SETTINGS['low_memory']:
+        return df.copy(deep=False)
+    return df.copy()
+
+def dummy_block(values, prefix, categories=None, drop_first=False, dtype=bool, index=None):
+    """
+    pd.get_dummies written into one preallocated indicator block: a single
+    scatter of ones at each row's category code, instead of one new column
+    per category. Categories default to the sorted distinct values, as in
+    get_dummies; missing values get no indicator
+    """
+    categorical = pd.Categorical(values, categories=categories)
+    codes = categorical.codes
+    columns = [f'{prefix}_{category}' for category in categorical.categories]
+    block = np.zeros((len(codes), len(columns)), dtype=dtype)
+    rows = np.flatnonzero(codes >= 0)
+    block[rows, codes[rows]] = 1
+    if drop_first:
+        block, columns = block[:, 1:], columns[1:]
+    if index is None:
+        index = values.index if isinstance(values, pd.Series) else None
+    return pd.DataFrame(block, columns=columns, index=index)
+
+def design_matrix(sources, features, dtype=np.float64):
+    # Model matrix preallocated once and filled column by column from the first
+    # source frame holding each feature, instead of growing a frame with
+    # inserts and concats and then copying the selected columns out of it
+    index = sources[0].index
+    X = np.empty((len(index), len(features)), dtype=dtype)
+    for j, feature in enumerate(features):
+        source = next(frame for frame in sources if feature in frame.columns)
+        X[:, j] = source[feature].to_numpy(dtype=dtype)
+    return pd.DataFrame(X, columns=features, index=index)
+
+def measure_peak_memory(func, *args, **kwargs):
+    # tracemalloc sees numpy buffers and Python objects (including object-backed
+    # string columns), which is where the frame copies land
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if not already_tracing:
+        tracemalloc.stop()
+    return result, peak, elapsed
+
+if LOW_MEMORY:
+    set_low_memory(True)
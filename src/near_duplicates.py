@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from config.config import (MINHASH_NUM_PERM, MINHASH_CHUNK_ROWS, MINHASH_BLOCK_ELEMENTS, LSH_BANDS, LSH_FULL_BUCKET_SIZE,
+                           NEAR_DUPLICATE_THRESHOLD)
+from src.lazy_imports import lazy_import
+
+sparse = lazy_import('scipy.sparse')
+csgraph = lazy_import('scipy.sparse.csgraph')
+sklearn_text = lazy_import('sklearn.feature_extraction.text')
+
+TOKEN_SPACE = 1 << 20
+
+def listing_token_sets(df, description_col='description', amenities_col='amenities'):
+    print("Tokenising descriptions and amenities")
+    # Word 3-shingles of the description and individual amenities, each hashed
+    # into half of the token space so the two sources never share an id
+    blocks = []
+    if description_col in df.columns:
+        shingles = sklearn_text.HashingVectorizer(n_features=TOKEN_SPACE // 2, ngram_range=(3, 3), binary=True,
+                                     norm=None, alternate_sign=False)
+        blocks.append(shingles.transform(df[description_col].fillna('').astype(str)))
+    if amenities_col in df.columns:
+        amenities = sklearn_text.HashingVectorizer(n_features=TOKEN_SPACE // 2, binary=True, norm=None, alternate_sign=False,
+                                      token_pattern=None, preprocessor=lambda text: text.lower(),
+                                      tokenizer=lambda text: [t.strip(' "{}[]') for t in text.split(',') if t.strip(' "{}[]')])
+        blocks.append(amenities.transform(df[amenities_col].fillna('').astype(str)))
+    if not blocks:
+        raise ValueError(f"Neither '{description_col}' nor '{amenities_col}' found")
+    return sparse.hstack(blocks, format='csr')
+
+def minhash_signatures(token_matrix, num_perm=MINHASH_NUM_PERM, chunk_rows=MINHASH_CHUNK_ROWS,
+                       block_elements=MINHASH_BLOCK_ELEMENTS, random_state=42):
+    print(f"Computing {num_perm}-permutation MinHash signatures")
+    rng = np.random.default_rng(random_state)
+    a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None]
+
+    n_docs = token_matrix.shape[0]
+    signatures = np.full((n_docs, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_tokens = np.diff(token_matrix.indptr) > 0
+
+    for start in range(0, n_docs, chunk_rows):
+        block = token_matrix[start:start + chunk_rows]
+        rows = np.flatnonzero(np.diff(block.indptr) > 0)
+        if len(rows) == 0:
+            continue
+        # Multiply-shift hashes of every token (uint64 arithmetic wraps, the top
+        # 32 bits are kept); the row minimum is the signature. Permutations go
+        # in blocks so the hash table stays under block_elements entries
+        tokens = block.indices.astype(np.uint64)[None, :]
+        perm_block = max(1, block_elements // max(len(tokens[0]), 1))
+        for p in range(0, num_perm, perm_block):
+            hashed = (a[p:p + perm_block] * tokens + b[p:p + perm_block]) >> np.uint64(32)
+            signatures[start + rows, p:p + perm_block] = np.minimum.reduceat(hashed, block.indptr[rows], axis=1).T
+
+    return signatures, has_tokens
+
+def lsh_candidate_pairs(signatures, has_tokens, bands=LSH_BANDS, full_bucket_size=LSH_FULL_BUCKET_SIZE):
+    # Every pair within buckets of up to full_bucket_size members; larger
+    # buckets pair each member with the bucket's first member only, so the
+    # pair count stays linear in bucket size
+    num_perm = signatures.shape[1]
+    rows_per_band = num_perm // bands
+    docs = np.flatnonzero(has_tokens)
+    mixer = np.random.default_rng(0).integers(1, 1 << 61, rows_per_band, dtype=np.int64).astype(np.uint64)
+
+    left, right = [], []
+    for band in range(bands):
+        band_slice = signatures[docs, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = (band_slice * mixer).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(keys)])
+        bucket = np.repeat(np.arange(len(starts)), sizes)
+        small = sizes[bucket] <= full_bucket_size
+
+        for offset in range(1, min(full_bucket_size, sizes.max()) if len(sizes) else 1):
+            pair = (bucket[offset:] == bucket[:-offset]) & small[offset:]
+            left.append(docs[order[:-offset][pair]])
+            right.append(docs[order[offset:][pair]])
+        large = ~small & (np.arange(len(keys)) != starts[bucket])
+        left.append(docs[order[starts[bucket[large]]]])
+        right.append(docs[order[large]])
+
+    left = np.concatenate(left) if left else np.array([], dtype=np.int64)
+    right = np.concatenate(right) if right else np.array([], dtype=np.int64)
+    pairs = np.unique(np.column_stack([np.minimum(left, right), np.maximum(left, right)]), axis=0)
+    return pairs
+
+def find_near_duplicates(df, threshold=NEAR_DUPLICATE_THRESHOLD, num_perm=MINHASH_NUM_PERM, bands=LSH_BANDS):
+    print("=== NEAR-DUPLICATE LISTING DETECTION ===")
+    token_matrix = listing_token_sets(df)
+    signatures, has_tokens = minhash_signatures(token_matrix, num_perm)
+    pairs = lsh_candidate_pairs(signatures, has_tokens, bands)
+
+    # Keep candidate pairs whose estimated Jaccard similarity clears the threshold
+    if len(pairs):
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+    print(f"Verified {len(pairs)} near-duplicate pairs (Jaccard >= {threshold})")
+
+    n_docs = len(df)
+    graph = sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n_docs, n_docs))
+    _, labels = csgraph.connected_components(graph, directed=False)
+    cluster_sizes = np.bincount(labels)[labels]
+
+    clusters = pd.DataFrame({
+        'duplicate_cluster_id': labels,
+        'duplicate_cluster_size': cluster_sizes
+    }, index=df.index)
+    n_clusters = len(np.unique(labels[cluster_sizes > 1]))
+    print(f"Found {n_clusters} duplicate clusters covering {(cluster_sizes > 1).sum()} listings")
+    return clusters
+
+def drop_near_duplicates(df, clusters):
+    keep = ~clusters['duplicate_cluster_id'].duplicated(keep='first')
+    print(f"Dropping {(~keep).sum()} near-duplicate listings, keeping one per cluster")
+    return df[keep.to_numpy()]
@@ -1,66 +1,43 @@
 # pca_analyzer.py - FIXED VERSION
+import os
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from config.config import N_COMPONENTS
+from config.config import N_COMPONENTS, PCA_MODEL_PATH, COLUMN_SCHEMA_PATH
+from src.lazy_imports import lazy_import
+from src.column_types import coerce_columns
 
-def clean_numeric_data(data):
+joblib = lazy_import('joblib')
+preprocessing = lazy_import('sklearn.preprocessing')
+decomposition = lazy_import('sklearn.decomposition')
+
+def clean_numeric_data(data, schema_path=COLUMN_SCHEMA_PATH):
+    # Coercion decisions are cached per column (see src/column_types.py), so
+    # every snapshot and city is coerced the same way in one bulk step
     print("Ensuring all PCA data is numeric")
-    data_clean = data.copy()
-    
-    problematic_columns = []
-    
-    for col in data_clean.columns:
-        if data_clean[col].dtype == 'object':
-            print(f"Converting column '{col}' to numeric")
-            try:
-                data_clean[col] = pd.to_numeric(data_clean[col], errors='coerce')
-                
-                if data_clean[col].isnull().mean() > 0.5:
-                    problematic_columns.append(col)
-                    print(f"Column '{col}' has too many non-numeric values - will be dropped")
-                else:
-                    median_val = data_clean[col].median()
-                    data_clean[col] = data_clean[col].fillna(median_val)
-                    print(f"Column '{col}' converted successfully")
-                    
-            except Exception as e:
-                problematic_columns.append(col)
-                print(f"Column '{col}' failed conversion: {e}")
-    
-    if problematic_columns:
-        print(f"Dropping {len(problematic_columns)} problematic columns: {problematic_columns}")
-        data_clean = data_clean.drop(columns=problematic_columns)
-    
-    non_numeric_cols = data_clean.select_dtypes(include=['object']).columns
-    if len(non_numeric_cols) > 0:
-        print(f"Still found non-numeric columns: {list(non_numeric_cols)} - dropping them")
-        data_clean = data_clean.drop(columns=non_numeric_cols)
-    
+    data_clean, _, _ = coerce_columns(data, schema_path=schema_path)
     print(f"Final PCA data shape: {data_clean.shape}")
     return data_clean
 
-def perform_pca(data, n_components=N_COMPONENTS):
+def perform_pca(data, n_components=N_COMPONENTS, schema_path=COLUMN_SCHEMA_PATH):
     print(" Performing PCA")
     
-    data_clean = clean_numeric_data(data)
+    data_clean = clean_numeric_data(data, schema_path)
     
     if data_clean.shape[1] < 2:
         raise ValueError(f"Not enough numeric features for PCA. Only {data_clean.shape[1]} features remaining.")
     
-    scaler = StandardScaler()
+    scaler = preprocessing.StandardScaler()
     data_scaled = scaler.fit_transform(data_clean)
     
     if n_components is None:
-        pca_full = PCA()
+        pca_full = decomposition.PCA()
         pca_full.fit(data_scaled)
         explained_variance = pca_full.explained_variance_ratio_
         cumulative_variance = np.cumsum(explained_variance)
         n_components = np.argmax(cumulative_variance >= 0.95) + 1
         print(f"Selected {n_components} components explaining {cumulative_variance[n_components-1]:.2%} of variance")
     
-    pca = PCA(n_components=n_components)
+    pca = decomposition.PCA(n_components=n_components)
     principal_components = pca.fit_transform(data_scaled)
     
     pc_columns = [f'PC{i+1}' for i in range(n_components)]
@@ -94,4 +71,28 @@ def analyze_pca_results(pca, feature_names, principal_df):
             loading = component[idx]
             print(f"  {feature}: {loading:.3f}")
     
-    return components_df, explained_variance, cumulative_variance
\ No newline at end of file
+    return components_df, explained_variance, cumulative_variance
+
+def save_pca_model(pca, scaler, feature_names, file_path=PCA_MODEL_PATH):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    joblib.dump({'pca': pca, 'scaler': scaler, 'features': list(feature_names)}, file_path)
+    print(f"PCA model saved to: {file_path}")
+
+def load_pca_model(file_path=PCA_MODEL_PATH):
+    try:
+        return joblib.load(file_path)
+    except FileNotFoundError:
+        print(f"Error: File {file_path} not found!")
+        return None
+
+def project_listings(df, pca_bundle):
+    # Expects engineered features (see engineer_features); missing values and
+    # absent columns fall back to the training mean so they project to zero
+    features = pca_bundle['features']
+    scaler = pca_bundle['scaler']
+    data = df.reindex(columns=features).apply(pd.to_numeric, errors='coerce').astype(float)
+    data = data.fillna(pd.Series(scaler.mean_, index=features))
+    
+    principal_components = pca_bundle['pca'].transform(scaler.transform(data))
+    pc_columns = [f'PC{i+1}' for i in range(principal_components.shape[1])]
+    return pd.DataFrame(principal_components, columns=pc_columns, index=df.index)
\ No newline at end of file
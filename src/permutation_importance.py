@@ -0,0 +1,73 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from config.config import N_WORKERS
+
+_WORKER_STATE = {}
+
+def r2_from_predictions(y_true, y_pred, total_ss):
+    return 1 - np.sum((y_true - y_pred) ** 2) / total_ss
+
+def _init_worker(model, X_test, y_test, n_repeats, random_state):
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+    X_test = np.asarray(X_test, dtype=float)
+    _WORKER_STATE.update({
+        'model': model,
+        'X_original': X_test,
+        # One scratch copy per worker; columns are permuted in place and restored
+        'X_buffer': X_test.copy(),
+        'column_buffer': np.empty(X_test.shape[0]),
+        'y_test': np.asarray(y_test, dtype=float),
+        'total_ss': np.sum((y_test - np.mean(y_test)) ** 2),
+        'n_repeats': n_repeats,
+        'random_state': random_state
+    })
+
+def _permute_feature(task):
+    column, baseline_score = task
+    state = _WORKER_STATE
+    X_buffer, original = state['X_buffer'], state['X_original'][:, column]
+    rng = np.random.default_rng([state['random_state'], column])
+
+    scores = np.empty(state['n_repeats'])
+    for repeat in range(state['n_repeats']):
+        np.take(original, rng.permutation(len(original)), out=state['column_buffer'])
+        X_buffer[:, column] = state['column_buffer']
+        predictions = state['model'].predict(X_buffer)
+        scores[repeat] = baseline_score - r2_from_predictions(state['y_test'], predictions, state['total_ss'])
+    X_buffer[:, column] = original
+    return column, scores
+
+def compute_permutation_importance(model, X_test, y_test, feature_names, n_repeats=5, n_workers=N_WORKERS,
+                                   random_state=42):
+    print(f"Computing permutation importance ({len(feature_names)} features, {n_repeats} repeats)")
+    X_test = np.asarray(X_test, dtype=float)
+    y_test = np.asarray(y_test, dtype=float)
+
+    # Baseline predictions are computed once and shared by every feature
+    baseline_predictions = model.predict(X_test)
+    total_ss = np.sum((y_test - y_test.mean()) ** 2)
+    baseline_score = r2_from_predictions(y_test, baseline_predictions, total_ss)
+    print(f"Held-out baseline R-squared: {baseline_score:.3f}")
+
+    tasks = [(column, baseline_score) for column in range(X_test.shape[1])]
+    init_args = (model, X_test, y_test, n_repeats, random_state)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers == 1:
+        n_jobs = getattr(model, 'n_jobs', None)
+        _init_worker(*init_args)
+        results = [_permute_feature(task) for task in tasks]
+        if n_jobs is not None:
+            model.n_jobs = n_jobs
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as executor:
+            results = list(executor.map(_permute_feature, tasks))
+
+    scores = np.vstack([result_scores for _, result_scores in sorted(results, key=lambda r: r[0])])
+    return pd.DataFrame({
+        'feature': feature_names,
+        'importance': scores.mean(axis=1),
+        'importance_std': scores.std(axis=1)
+    }).sort_values('importance', ascending=False)
@@ -0,0 +1,161 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+from config.config import QUANTILE_GRID, QUANTILE_MAX_ITER, QUANTILE_TOL, QUANTILE_EFFECT_ROWS, N_WORKERS
+from src.lazy_imports import lazy_import
+
+ensemble = lazy_import('sklearn.ensemble')
+stats = lazy_import('scipy.stats')
+
+_WORKER_STATE = {}
+_NORMAL = NormalDist()
+
+def _fit_linear_quantile(X, y, q, start, max_iter=QUANTILE_MAX_ITER, tol=QUANTILE_TOL):
+    # Iteratively reweighted least squares on the check loss (the algorithm
+    # statsmodels' QuantReg uses), started from start. Returns (beta, number
+    # of iterations, converged); at max_iter beta is the last iterate
+    beta = start
+    converged = False
+    for n_iter in range(1, max_iter + 1):
+        resid = y - X @ beta
+        weights = np.where(resid > 0, q, 1 - q) / np.maximum(np.abs(resid), 1e-6)
+        Xw = X * weights[:, None]
+        new_beta = np.linalg.lstsq(Xw.T @ X, Xw.T @ y, rcond=None)[0]
+        converged = np.max(np.abs(new_beta - beta)) < tol
+        beta = new_beta
+        if converged:
+            break
+    return beta, n_iter, converged
+
+def _quantile_std_errors(X, y, beta, q, alpha=0.05):
+    # Powell's kernel sandwich, heteroskedasticity-robust, with the
+    # Epanechnikov kernel and the Hall-Sheather bandwidth QuantReg uses
+    n = len(y)
+    resid = y - X @ beta
+    z = _NORMAL.inv_cdf(q)
+    h = (n ** (-1 / 3) * _NORMAL.inv_cdf(1 - alpha / 2) ** (2 / 3)
+         * (1.5 * _NORMAL.pdf(z) ** 2 / (2 * z ** 2 + 1)) ** (1 / 3))
+    iqr = np.subtract(*np.percentile(resid, [75, 25]))
+    h = min(np.std(y), iqr / 1.34) * (_NORMAL.inv_cdf(min(q + h, 1 - 1e-9)) - _NORMAL.inv_cdf(max(q - h, 1e-9)))
+    u = resid / h
+    density = np.where(np.abs(u) <= 1, 0.75 * (1 - u ** 2), 0.0) / h
+    xtdx_inv = np.linalg.pinv((X * density[:, None]).T @ X)
+    vcov = q * (1 - q) * xtdx_inv @ (X.T @ X) @ xtdx_inv
+    return np.sqrt(np.clip(np.diag(vcov), 0, None))
+
+def _init_worker(X, y, eval_X, binary_columns, random_state, start=None):
+    _WORKER_STATE.update({'X': X, 'y': y, 'eval_X': eval_X, 'binary_columns': binary_columns,
+                          'random_state': random_state, 'start': start})
+
+def _fit_linear_task(q):
+    # Every quantile starts from OLS, so the fits are independent. A
+    # neighbouring quantile's solution does not reliably save iterations: it
+    # interpolates some listings exactly, and the 1e-6 residual floor gives
+    # them weights that dominate the first steps
+    X, y = _WORKER_STATE['X'], _WORKER_STATE['y']
+    beta, n_iter, converged = _fit_linear_quantile(X, y, q, _WORKER_STATE['start'])
+    return q, beta, _quantile_std_errors(X, y, beta, q), n_iter, converged
+
+def _fit_hgb_quantile(q):
+    state = _WORKER_STATE
+    model = ensemble.HistGradientBoostingRegressor(loss='quantile', quantile=q, random_state=state['random_state'])
+    model.fit(state['X'], state['y'])
+
+    # Model-based premium: average change in the predicted quantile when a
+    # binary feature is switched from 0 to 1 (other features: one unit up)
+    eval_X = state['eval_X']
+    effects = np.empty(eval_X.shape[1])
+    scratch = eval_X.copy()
+    for col in range(eval_X.shape[1]):
+        if state['binary_columns'][col]:
+            scratch[:, col] = 0
+            low = model.predict(scratch)
+            scratch[:, col] = 1
+        else:
+            low = model.predict(scratch)
+            scratch[:, col] = eval_X[:, col] + 1
+        effects[col] = np.mean(model.predict(scratch) - low)
+        scratch[:, col] = eval_X[:, col]
+    return q, effects, model.n_iter_
+
+def fit_quantile_grid(X, y, feature_names, quantiles=QUANTILE_GRID, backend='linear', n_workers=N_WORKERS,
+                      effect_rows=QUANTILE_EFFECT_ROWS, random_state=42):
+    """
+    Fit log-price models at every quantile in the grid. Returns a long table
+    with one row per (quantile, feature): coefficient, std_error, p_value,
+    and whether the fit converged (a warning names the quantiles that did not).
+
+    Quantiles are fitted independently, one per worker.
+    backend='linear': linear quantile regression, each fit started from OLS.
+    backend='hgb': histogram gradient boosting with the quantile loss, for
+    large data or nonlinear effects. Coefficients are the average 0 -> 1
+    contrast of binary features (+1 unit for the others) on up to effect_rows
+    listings; no standard errors.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    quantiles = sorted(quantiles)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(quantiles))
+    print(f"Fitting {len(quantiles)} quantiles ({backend}) on {X.shape[0]} rows, {X.shape[1]} features, "
+          f"{n_workers} workers")
+
+    if backend == 'linear':
+        X_model = np.column_stack([np.ones(len(X)), X])
+        names = ['const'] + list(feature_names)
+        init_args = (X_model, y, None, None, random_state, np.linalg.lstsq(X_model, y, rcond=None)[0])
+        work = _fit_linear_task
+    elif backend == 'hgb':
+        names = list(feature_names)
+        rng = np.random.default_rng(random_state)
+        eval_X = X[rng.choice(len(X), size=min(effect_rows, len(X)), replace=False)]
+        binary_columns = [bool(np.isin(np.unique(X[:, col]), [0, 1]).all()) for col in range(X.shape[1])]
+        init_args = (X, y, eval_X, binary_columns, random_state)
+        work = _fit_hgb_quantile
+    else:
+        raise ValueError(f"Unknown quantile backend '{backend}' (expected 'linear' or 'hgb')")
+
+    if n_workers == 1:
+        _init_worker(*init_args)
+        results = [work(q) for q in quantiles]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as executor:
+            results = list(executor.map(work, quantiles))
+
+    rows = []
+    if backend == 'linear':
+        for q, beta, std_error, n_iter, converged in results:
+            p_value = 2 * stats.norm.sf(np.abs(beta / np.where(std_error > 0, std_error, np.nan)))
+            rows.append(pd.DataFrame({'quantile': q, 'feature': names, 'coefficient': beta,
+                                      'std_error': std_error, 'p_value': p_value, 'n_iter': n_iter,
+                                      'converged': converged}))
+    else:
+        # Boosting runs a fixed number of rounds; there is no convergence test
+        for q, effects, n_iter in results:
+            rows.append(pd.DataFrame({'quantile': q, 'feature': names, 'coefficient': effects,
+                                      'std_error': np.nan, 'p_value': np.nan, 'n_iter': n_iter,
+                                      'converged': True}))
+    fits = pd.concat(rows, ignore_index=True)
+    per_quantile = fits.groupby('quantile')[['n_iter', 'converged']].first()
+    print("Iterations per quantile: " + ", ".join(
+        f"{q:g}: {row['n_iter']}" + ("" if row['converged'] else " (not converged)")
+        for q, row in per_quantile.iterrows()))
+    for q in per_quantile.index[~per_quantile['converged'].astype(bool)]:
+        warnings.warn(f"Quantile {q:g} stopped at the iteration limit ({QUANTILE_MAX_ITER}) without converging; "
+                      f"its coefficients and standard errors are the last iterate", RuntimeWarning)
+    return fits
+
+def quantile_premium_table(fits, features, name_col, prefix=''):
+    """
+    Premium table by quantile, in the shape of the mean-model premium tables
+    (one row per quantile and feature, plus a quantile column)
+    """
+    table = fits[fits['feature'].isin(features)].copy()
+    table[name_col] = table['feature'].str.slice(len(prefix)) if prefix else table['feature']
+    table['premium_multiplier'] = np.exp(table['coefficient'])
+    table['premium_percent'] = (table['premium_multiplier'] - 1) * 100
+    table['significant'] = table['p_value'] < 0.05
+    return table[['quantile', name_col, 'premium_multiplier', 'premium_percent', 'std_error', 'p_value',
+                  'significant', 'converged']].reset_index(drop=True)
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import sqlite3
+import subprocess
+import numpy as np
+import pandas as pd
+from config.config import CITY, SNAPSHOT_DATE
+
+# Result tables hand over numpy scalars, which sqlite3 does not know how to store
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.bool_, int)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    city TEXT NOT NULL,
+    snapshot_date TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    sample_fraction REAL,
+    sample_seed INTEGER,
+    data_path TEXT,
+    settings TEXT,
+    recorded_at TEXT,
+    UNIQUE (city, snapshot_date, code_version, sample_fraction, sample_seed)
+);
+CREATE TABLE IF NOT EXISTS premiums (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    premium_percent REAL,
+    std_error REAL,
+    p_value REAL,
+    significant INTEGER,
+    premium_percent_low REAL,
+    premium_percent_high REAL
+);
+CREATE TABLE IF NOT EXISTS coefficients (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    model TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    coefficient REAL,
+    std_error REAL,
+    p_value REAL
+);
+CREATE TABLE IF NOT EXISTS feature_importance (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    feature TEXT NOT NULL,
+    importance REAL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_snapshot ON runs (city, snapshot_date);
+CREATE INDEX IF NOT EXISTS idx_premiums_name ON premiums (kind, name, run_id);
+CREATE INDEX IF NOT EXISTS idx_coefficients_feature ON coefficients (model, feature, run_id);
+CREATE INDEX IF NOT EXISTS idx_importance_feature ON feature_importance (feature, run_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics (name, run_id);
+"""
+
+PREMIUM_COLUMNS = ['premium_percent', 'std_error', 'p_value', 'significant', 'premium_percent_low',
+                   'premium_percent_high']
+
+RUN_COLUMNS = ['run_id', 'city', 'snapshot_date', 'code_version', 'sample_fraction', 'data_path', 'settings',
+               'recorded_at']
+
+def _add_sample_seed(conn):
+    # Stores written before runs were keyed by seed: rebuild runs with the new
+    # key (SQLite cannot change a UNIQUE constraint in place). Foreign keys are
+    # off, so dropping the old table leaves the result rows alone
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(runs)')]
+    if not columns or 'sample_seed' in columns:
+        return
+    print("Adding sample_seed to the run history")
+    conn.execute('PRAGMA foreign_keys = OFF')
+    runs_table = SCHEMA[SCHEMA.index('CREATE TABLE IF NOT EXISTS runs'):SCHEMA.index(');') + 2]
+    conn.executescript('BEGIN;' + runs_table.replace('IF NOT EXISTS runs', 'runs_new') +
+                       f"INSERT INTO runs_new ({', '.join(RUN_COLUMNS)}) SELECT {', '.join(RUN_COLUMNS)} FROM runs;"
+                       'DROP TABLE runs; ALTER TABLE runs_new RENAME TO runs; COMMIT;')
+
+def open_result_store(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    _add_sample_seed(conn)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+def code_version(store_path=None):
+    # The commit the results were produced with, marked when the tree had local
+    # changes; the store itself is left out, since recording a run rewrites it
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pathspec = []
+    if store_path and not os.path.relpath(os.path.abspath(store_path), root).startswith('..'):
+        pathspec = ['--', '.', f':(exclude){os.path.relpath(os.path.abspath(store_path), root)}']
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'] + pathspec, cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+def snapshot_date_of(data_path, snapshot_date=SNAPSHOT_DATE):
+    """
+    Snapshot date of a listings file: the configured date if set, else the
+    latest last_scraped date in the file, else (with a warning, since it says
+    when the file was written rather than scraped) its modification date
+    """
+    if snapshot_date is not None:
+        return str(snapshot_date)
+    header = pd.read_csv(data_path, nrows=0).columns
+    if 'last_scraped' in header:
+        scraped = pd.to_datetime(pd.read_csv(data_path, usecols=['last_scraped'])['last_scraped'], errors='coerce')
+        if scraped.notna().any():
+            return scraped.max().strftime('%Y-%m-%d')
+    fallback = time.strftime('%Y-%m-%d', time.localtime(os.path.getmtime(data_path)))
+    print(f"Warning: {data_path} has no last_scraped dates - using its modification date {fallback} as the "
+          f"snapshot date (pass --snapshot-date to set it)")
+    return fallback
+
+def _premium_rows(run_id, kind, name_col, table):
+    if table is None or len(table) == 0:
+        return []
+    table = table.reindex(columns=[name_col] + PREMIUM_COLUMNS)
+    table = table.astype(object).where(table.notna(), None)
+    return [(run_id, kind, str(row[0]), *row[1:]) for row in table.itertuples(index=False, name=None)]
+
+def record_run(path, data_path, neighborhood_results=None, amenity_results=None, host_results=None,
+               integrated_results=None, sample_fraction=None, sample_seed=None, settings=None, city=CITY,
+               snapshot_date=SNAPSHOT_DATE):
+    """
+    Write one run's result tables to the store. A run is keyed by city,
+    snapshot date, code version, sample fraction and sample seed; recording
+    the same key again replaces the earlier results
+    """
+    snapshot = snapshot_date_of(data_path, snapshot_date)
+    version = code_version(path)
+    sample_seed = sample_seed if sample_fraction else None
+    conn = open_result_store(path)
+    with conn:
+        conn.execute('DELETE FROM runs WHERE city = ? AND snapshot_date = ? AND code_version = ? '
+                     'AND sample_fraction IS ? AND sample_seed IS ?',
+                     (city, snapshot, version, sample_fraction, sample_seed))
+        run_id = conn.execute(
+            'INSERT INTO runs (city, snapshot_date, code_version, sample_fraction, sample_seed, data_path, settings, '
+            'recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (city, snapshot, version, sample_fraction, sample_seed, os.path.abspath(data_path),
+             json.dumps(settings or {}, sort_keys=True, default=str), time.strftime('%Y-%m-%d %H:%M:%S'))
+        ).lastrowid
+
+        premiums = (_premium_rows(run_id, 'neighborhood', 'neighborhood', neighborhood_results) +
+                    _premium_rows(run_id, 'amenity', 'amenity', amenity_results))
+        metrics = []
+        if host_results is not None:
+            if host_results.get('professional_host_premium') is not None:
+                premiums.append((run_id, 'host', 'professional_host', host_results['professional_host_premium'],
+                                 host_results.get('professional_host_std_error'), None, None, None, None))
+            metrics.append((run_id, 'host_price_difference_p_value', host_results['price_difference_test']['p_value']))
+        conn.executemany('INSERT INTO premiums VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', premiums)
+
+        if integrated_results is not None:
+            coefficients = integrated_results['coefficients'].reindex(
+                columns=['feature', 'coefficient', 'std_error', 'p_value'])
+            conn.executemany('INSERT INTO coefficients VALUES (?, ?, ?, ?, ?, ?)',
+                             [(run_id, 'integrated_ols', *row) for row in coefficients.itertuples(index=False, name=None)])
+            conn.executemany('INSERT INTO feature_importance VALUES (?, ?, ?)',
+                             [(run_id, feature, importance) for feature, importance in
+                              integrated_results['feature_importance'][['feature', 'importance']].itertuples(
+                                  index=False, name=None)])
+            metrics.append((run_id, 'integrated_r2', integrated_results['ols_model'].rsquared))
+            metrics.append((run_id, 'integrated_adj_r2', integrated_results['ols_model'].rsquared_adj))
+            if integrated_results.get('cv_metrics') is not None:
+                for _, row in integrated_results['cv_metrics'].iterrows():
+                    for metric in ['rmse', 'mae', 'r2']:
+                        metrics.append((run_id, f"cv_{row['backend']}_{row['scheme']}_{metric}", row[metric]))
+        conn.executemany('INSERT INTO metrics VALUES (?, ?, ?)', metrics)
+    conn.close()
+    print(f"Recorded run {run_id} ({city}, snapshot {snapshot}, code {version}) in {path}")
+    return run_id
+
+def _trend(path, query, params, last):
+    conn = open_result_store(path)
+    trend = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    # Latest recording per snapshot, then the last `last` snapshots in date order
+    trend = trend.drop_duplicates('snapshot_date', keep='last')
+    return trend.tail(last).reset_index(drop=True) if last else trend.reset_index(drop=True)
+
+def premium_trend(path, name, kind='amenity', city=CITY, last=24, full_runs_only=True):
+    """
+    Premium of one neighborhood, amenity or 'professional_host' across
+    snapshots, e.g. premium_trend(path, 'pool') for the pool premium
+    """
+    name = name[len('has_'):] if kind == 'amenity' and name.startswith('has_') else name
+    query = ('SELECT r.snapshot_date, r.code_version, r.sample_fraction, p.* FROM premiums p '
+             'JOIN runs r ON r.run_id = p.run_id WHERE p.kind = ? AND p.name = ? AND r.city = ? '
+             + ('AND r.sample_fraction IS NULL ' if full_runs_only else '') +
+             'ORDER BY r.snapshot_date, r.run_id')
+    return _trend(path, query, (kind, name, city), last)
+
+def coefficient_trend(path, feature, model='integrated_ols', city=CITY, last=24, full_runs_only=True):
+    query = ('SELECT r.snapshot_date, r.code_version, r.sample_fraction, c.* FROM coefficients c '
+             'JOIN runs r ON r.run_id = c.run_id WHERE c.model = ? AND c.feature = ? AND r.city = ? '
+             + ('AND r.sample_fraction IS NULL ' if full_runs_only else '') +
+             'ORDER BY r.snapshot_date, r.run_id')
+    return _trend(path, query, (model, feature, city), last)
+
+def metric_trend(path, name, city=CITY, last=24, full_runs_only=True):
+    query = ('SELECT r.snapshot_date, r.code_version, r.sample_fraction, m.* FROM metrics m '
+             'JOIN runs r ON r.run_id = m.run_id WHERE m.name = ? AND r.city = ? '
+             + ('AND r.sample_fraction IS NULL ' if full_runs_only else '') +
+             'ORDER BY r.snapshot_date, r.run_id')
+    return _trend(path, query, (name, city), last)
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+import pandas as pd
+from config.config import (REVIEWS_PATH, REVIEWS_STATE_PATH, REVIEWS_FEATURES_PATH, REVIEWS_CHUNK_ROWS,
+                           REVIEW_BURST_WINDOW_DAYS, REVIEW_BURST_RATIO)
+
+def load_review_series(state_path=REVIEWS_STATE_PATH):
+    if not os.path.exists(state_path):
+        return None
+    with np.load(state_path) as state:
+        return {
+            'listing_id': state['listing_id'],
+            'day': state['day'],
+            'max_review_id': int(state['max_review_id'])
+        }
+
+def save_review_series(series, state_path=REVIEWS_STATE_PATH):
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    np.savez(state_path, listing_id=series['listing_id'], day=series['day'],
+             max_review_id=np.int64(series['max_review_id']))
+
+def ingest_reviews(file_path=REVIEWS_PATH, state_path=REVIEWS_STATE_PATH, chunksize=REVIEWS_CHUNK_ROWS,
+                   incremental=True):
+    print("Ingesting reviews data")
+
+    series = load_review_series(state_path) if incremental else None
+    if series is None:
+        series = {'listing_id': np.array([], dtype=np.int64), 'day': np.array([], dtype=np.int32),
+                  'max_review_id': -1}
+    else:
+        print(f"   Resuming from {len(series['day'])} stored reviews (max review id {series['max_review_id']})")
+
+    # Review ids only grow between snapshots, so anything at or below the
+    # stored watermark has already been ingested
+    watermark = series['max_review_id']
+    new_listing_ids = []
+    new_days = []
+    max_review_id = watermark
+    n_rows = 0
+    try:
+        reader = pd.read_csv(file_path, usecols=['listing_id', 'id', 'date'],
+                             dtype={'listing_id': 'int64', 'id': 'int64'}, chunksize=chunksize)
+        for chunk in reader:
+            n_rows += len(chunk)
+            chunk = chunk[chunk['id'].to_numpy() > watermark]
+            if len(chunk) == 0:
+                continue
+            dates = pd.to_datetime(chunk['date'], format='%Y-%m-%d', errors='coerce')
+            has_date = dates.notna().to_numpy()
+            days = (dates[has_date].to_numpy().astype('datetime64[D]').astype(np.int64)).astype(np.int32)
+            new_listing_ids.append(chunk['listing_id'].to_numpy()[has_date])
+            new_days.append(days)
+            max_review_id = max(max_review_id, int(chunk['id'].max()))
+    except FileNotFoundError:
+        print(f"Error: File {file_path} not found!")
+        return None
+
+    n_new = sum(len(d) for d in new_days)
+    print(f"   Scanned {n_rows} review rows, {n_new} new reviews")
+
+    series = {
+        'listing_id': np.concatenate([series['listing_id']] + new_listing_ids),
+        'day': np.concatenate([series['day']] + new_days),
+        'max_review_id': max_review_id
+    }
+    save_review_series(series, state_path)
+    print(f"Review series for {len(series['day'])} reviews saved to: {state_path}")
+    return series
+
+def compute_review_features(series, reference_date=None, output_path=REVIEWS_FEATURES_PATH):
+    print("Computing review velocity features")
+
+    day = series['day']
+    if reference_date is None:
+        reference_day = int(day.max()) if len(day) else 0
+    else:
+        reference_day = int(np.datetime64(pd.Timestamp(reference_date).date(), 'D').astype(np.int64))
+
+    codes, listing_ids = pd.factorize(series['listing_id'], sort=True)
+    n_listings = len(listing_ids)
+    age = reference_day - day.astype(np.int64)
+    in_past = age >= 0
+
+    def window_count(days):
+        return np.bincount(codes[in_past & (age < days)], minlength=n_listings)
+
+    last_90 = window_count(90)
+    last_365 = window_count(365)
+    last_burst = window_count(REVIEW_BURST_WINDOW_DAYS)
+
+    last_day = np.full(n_listings, np.iinfo(np.int64).min)
+    np.maximum.at(last_day, codes[in_past], day[in_past].astype(np.int64))
+    days_since_last = np.where(last_day > np.iinfo(np.int64).min, reference_day - last_day, np.nan)
+
+    # A burst is a short window well above the listing's own trailing-year pace
+    baseline = last_365 * REVIEW_BURST_WINDOW_DAYS / 365
+    burst = (last_burst >= 2) & (last_burst >= REVIEW_BURST_RATIO * baseline)
+
+    features = pd.DataFrame({
+        'rev_velocity_90d': last_90 / 3.0,
+        'rev_velocity_365d': last_365 / 12.0,
+        'rev_days_since_last': days_since_last,
+        'rev_burst': burst.astype(int)
+    }, index=pd.Index(listing_ids, name='id'))
+
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        features.to_csv(output_path)
+        print(f"Review features for {len(features)} listings saved to: {output_path}")
+    return features
+
+def load_review_features(file_path=REVIEWS_FEATURES_PATH):
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_csv(file_path, index_col='id')
+
+def review_features_for_listings(df, review_features):
+    listing_features = df[['id']].join(review_features, on='id').drop(columns=['id'])
+
+    # Listings absent from reviews.csv have never been reviewed
+    listing_features['rev_has_reviews'] = listing_features['rev_days_since_last'].notna().astype(int)
+    never_reviewed_gap = review_features['rev_days_since_last'].max()
+    listing_features['rev_days_since_last'] = listing_features['rev_days_since_last'].fillna(never_reviewed_gap)
+    return listing_features.fillna(0)
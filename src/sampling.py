@@ -0,0 +1,92 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from config.config import SAMPLE_STRATA, SAMPLE_SEED, SAMPLE_MIN_PER_STRATUM, SAMPLE_CONFIDENCE
+
+def stratified_sample_rows(df, fraction, strata=SAMPLE_STRATA, seed=SAMPLE_SEED, min_per_stratum=SAMPLE_MIN_PER_STRATUM):
+    """
+    Draw fraction of the rows of every strata cell (at least min_per_stratum,
+    at most the whole cell), without replacement. Returns the sorted index
+    labels of the sampled rows; the same seed always gives the same rows
+    """
+    strata = [col for col in strata if col in df.columns]
+    if not strata:
+        codes = np.zeros(len(df), dtype=np.int64)
+    else:
+        codes = df.groupby(strata, dropna=False, sort=False).ngroup().to_numpy()
+
+    sizes = np.bincount(codes)
+    take = np.minimum(sizes, np.maximum(min_per_stratum, np.rint(sizes * fraction).astype(np.int64)))
+
+    # Sort rows by cell, then by a random key: the first take[cell] rows of each
+    # cell are a simple random sample of it
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(df)), codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(df)) - starts[codes[order]]
+    chosen = np.sort(order[rank < take[codes[order]]])
+
+    print(f"Stratified sample: {len(chosen)} of {len(df)} rows from {len(sizes)} cells "
+          f"({', '.join(strata) or 'no strata columns'})")
+    return df.index[chosen]
+
+def load_or_draw_sample(df, fraction, cache_dir, data_fingerprint, seed=SAMPLE_SEED, strata=SAMPLE_STRATA,
+                        min_per_stratum=SAMPLE_MIN_PER_STRATUM):
+    """
+    Stratified sample of df, cached as the list of sampled row labels. The
+    cache file is keyed by fraction, seed, strata, min_per_stratum and the
+    fingerprint of the input data, so a changed dataset or design draws a new
+    sample
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    design = json.dumps({'strata': list(strata), 'min_per_stratum': int(min_per_stratum)}, sort_keys=True)
+    design_key = hashlib.sha256(design.encode()).hexdigest()[:8]
+    cache_path = os.path.join(cache_dir, f'stratified_{fraction:g}_seed{seed}_{design_key}_{data_fingerprint[:12]}.csv')
+
+    if os.path.exists(cache_path):
+        rows = pd.read_csv(cache_path)['row']
+        print(f"Loaded cached sample: {cache_path}")
+    else:
+        rows = pd.Series(stratified_sample_rows(df, fraction, strata, seed, min_per_stratum), name='row')
+        rows.to_csv(cache_path + '.tmp', index=False)
+        os.replace(cache_path + '.tmp', cache_path)
+        print(f"Cached sample: {cache_path}")
+
+    sample = df.loc[rows.to_numpy()]
+    return sample, len(sample) / len(df)
+
+def premium_bounds(coefficient, std_error, fraction, confidence=SAMPLE_CONFIDENCE):
+    """
+    Bounds (in percent) on how far the full-data premium can be from one
+    estimated on a sample holding fraction of the rows. The full data contains
+    the sample, so the gap has the sample standard error shrunk by the finite
+    population correction sqrt(1 - fraction)
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    margin = z * np.asarray(std_error) * np.sqrt(max(1 - fraction, 0.0))
+    low = (np.exp(np.asarray(coefficient) - margin) - 1) * 100
+    high = (np.exp(np.asarray(coefficient) + margin) - 1) * 100
+    return low, high
+
+def add_premium_bounds(premiums, fraction, confidence=SAMPLE_CONFIDENCE):
+    # Works on the neighborhood and amenity premium tables, which carry the
+    # multiplier exp(coefficient), and on the integrated model's coefficients
+    if premiums is None or len(premiums) == 0 or 'std_error' not in premiums.columns:
+        return premiums
+    premiums = premiums.copy()
+    if 'coefficient' in premiums.columns:
+        coefficient = premiums['coefficient']
+    else:
+        coefficient = np.log(premiums['premium_multiplier'])
+    premiums['premium_percent_low'], premiums['premium_percent_high'] = premium_bounds(
+        coefficient, premiums['std_error'], fraction, confidence
+    )
+    return premiums
+
+def sample_run_name(fraction, seed=SAMPLE_SEED):
+    # Sampled runs write results and checkpoints under their own name, so they
+    # never overwrite the full run that confirms them
+    return f'sample_{fraction:g}_seed{seed}'
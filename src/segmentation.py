@@ -0,0 +1,154 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from config.config import (SEGMENT_MODEL_PATH, SEGMENT_K_VALUES, SEGMENT_SAMPLE_ROWS, SEGMENT_SILHOUETTE_ROWS,
+                           SEGMENT_CHUNK_ROWS, SEGMENT_PASSES, SEGMENT_PRICE_BLIND_COLUMNS, N_WORKERS)
+from src.lazy_imports import lazy_import
+from src.pca_analyzer import project_listings
+from src.memory import dummy_block
+
+joblib = lazy_import('joblib')
+cluster = lazy_import('sklearn.cluster')
+metrics = lazy_import('sklearn.metrics')
+
+_WORKER_STATE = {}
+
+def _iter_chunks(data, chunk_rows, rng=None):
+    # data is one array/DataFrame or a list of them (e.g. one per city); chunks
+    # are visited in random order so a sorted input does not bias the updates
+    blocks = data if isinstance(data, (list, tuple)) else [data]
+    spans = [(block, start) for block in blocks for start in range(0, len(block), chunk_rows)]
+    order = rng.permutation(len(spans)) if rng is not None else range(len(spans))
+    for i in order:
+        block, start = spans[i]
+        yield np.asarray(block[start:start + chunk_rows], dtype=float)
+
+def _init_worker(sample, silhouette_rows, random_state):
+    _WORKER_STATE.update({'sample': sample, 'silhouette_rows': silhouette_rows, 'random_state': random_state})
+
+def _evaluate_k(k):
+    state = _WORKER_STATE
+    model = cluster.MiniBatchKMeans(n_clusters=k, random_state=state['random_state'], n_init=3)
+    labels = model.fit_predict(state['sample'])
+    silhouette = metrics.silhouette_score(state['sample'], labels,
+                                          sample_size=min(state['silhouette_rows'], len(state['sample'])),
+                                          random_state=state['random_state'])
+    return k, model.inertia_, silhouette
+
+def choose_n_segments(pc_data, k_values=SEGMENT_K_VALUES, sample_rows=SEGMENT_SAMPLE_ROWS,
+                      silhouette_rows=SEGMENT_SILHOUETTE_ROWS, n_workers=N_WORKERS, random_state=42):
+    """
+    Fit every k in k_values on a row sample, one k per worker, and pick the k
+    with the highest silhouette. Returns (best_k, sweep table)
+    """
+    data = np.asarray(pc_data, dtype=float)
+    rng = np.random.default_rng(random_state)
+    sample = data[rng.choice(len(data), size=min(sample_rows, len(data)), replace=False)]
+    feasible = [k for k in k_values if 1 < k < len(sample)]
+    if not feasible:
+        # The silhouette needs at least two segments and fewer segments than listings
+        raise ValueError(f"Cannot segment {len(sample)} listings: no k in {list(k_values)} is between 2 and "
+                         f"{len(sample) - 1}")
+    k_values = feasible
+    print(f"Segment sweep: k in {k_values} on {len(sample)} sampled listings")
+
+    init_args = (sample, silhouette_rows, random_state)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(k_values))
+    if n_workers == 1:
+        _init_worker(*init_args)
+        results = [_evaluate_k(k) for k in k_values]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as executor:
+            results = list(executor.map(_evaluate_k, k_values))
+
+    sweep = pd.DataFrame(results, columns=['k', 'inertia', 'silhouette'])
+    best_k = int(sweep.loc[sweep['silhouette'].idxmax(), 'k'])
+    for _, row in sweep.iterrows():
+        marker = " <- selected" if row['k'] == best_k else ""
+        print(f"  k={int(row['k'])}: inertia={row['inertia']:.1f}, silhouette={row['silhouette']:.3f}{marker}")
+    return best_k, sweep
+
+def fit_segments(pc_data, n_segments, chunk_rows=SEGMENT_CHUNK_ROWS, n_passes=SEGMENT_PASSES, random_state=42):
+    # Only one chunk is converted and held at a time, so the panel can be a
+    # list of per-city (or memory-mapped) arrays far larger than memory
+    model = cluster.MiniBatchKMeans(n_clusters=n_segments, batch_size=chunk_rows, random_state=random_state,
+                                    n_init=3)
+    rng = np.random.default_rng(random_state)
+    n_rows = 0
+    for _ in range(n_passes):
+        for chunk in _iter_chunks(pc_data, chunk_rows, rng):
+            if not hasattr(model, 'cluster_centers_') and len(chunk) < n_segments:
+                continue
+            model.partial_fit(chunk)
+            n_rows += len(chunk)
+    print(f"Fitted {n_segments} segments in {n_passes} streaming passes ({n_rows} rows seen)")
+    return model
+
+def save_segment_model(model, pc_columns, sweep=None, file_path=SEGMENT_MODEL_PATH):
+    # Only the centroids are needed to assign listings, not the sklearn model
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    joblib.dump({'centroids': model.cluster_centers_, 'pc_columns': list(pc_columns), 'sweep': sweep}, file_path)
+    print(f"Segment model saved to: {file_path}")
+
+def load_segment_model(file_path=SEGMENT_MODEL_PATH):
+    try:
+        return joblib.load(file_path)
+    except FileNotFoundError:
+        print(f"Error: File {file_path} not found!")
+        return None
+
+def assign_segments(pc_data, segment_bundle, chunk_rows=SEGMENT_CHUNK_ROWS):
+    # Nearest centroid via ||x||^2 - 2 x.c + ||c||^2; ||x||^2 is the same for
+    # every centroid, so it is left out of the argmin
+    centroids = segment_bundle['centroids']
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    index = pc_data.index if isinstance(pc_data, pd.DataFrame) else None
+    if index is not None:
+        pc_data = pc_data[segment_bundle['pc_columns']]
+
+    labels = np.empty(len(pc_data), dtype=np.int64)
+    for start in range(0, len(pc_data), chunk_rows):
+        chunk = np.asarray(pc_data[start:start + chunk_rows], dtype=float)
+        labels[start:start + len(chunk)] = np.argmin(centroid_norms - 2 * chunk @ centroids.T, axis=1)
+    return pd.Series(labels, index=index, name='segment_id')
+
+def segment_listings(principal_df, n_segments=None, n_workers=N_WORKERS, file_path=SEGMENT_MODEL_PATH):
+    """
+    Cluster listings in principal-component space: choose the number of
+    segments by a parallel sweep (unless given), fit mini-batch k-means in
+    streaming chunks, save the centroids and return each listing's segment_id
+    """
+    print("\n=== MARKET SEGMENTATION ===")
+    sweep = None
+    if n_segments is None:
+        n_segments, sweep = choose_n_segments(principal_df, n_workers=n_workers)
+    model = fit_segments(principal_df, n_segments)
+    save_segment_model(model, principal_df.columns, sweep, file_path)
+
+    segment_ids = assign_segments(principal_df, {'centroids': model.cluster_centers_,
+                                                 'pc_columns': list(principal_df.columns)})
+    print("Listings per segment: " + ", ".join(f"{segment}: {count}" for segment, count in
+                                              segment_ids.value_counts().sort_index().items()))
+    return segment_ids, sweep
+
+def price_blind_projection(df_featured, pca_bundle, price_blind=SEGMENT_PRICE_BLIND_COLUMNS):
+    """
+    Principal components of each listing with its own price columns left out
+    (they fall back to the training mean). The components load on price, so
+    segments are both fitted and assigned on this projection and a listing's
+    segment never encodes the price being modelled
+    """
+    return project_listings(df_featured.drop(columns=[col for col in price_blind if col in df_featured.columns]),
+                            pca_bundle)
+
+def segment_features_for_listings(df_featured, pca_bundle, segment_bundle):
+    """
+    Segment fixed effects (one dummy per segment, the first dropped) for the
+    hedonic models, from the same price-blind projection the segments were
+    fitted on
+    """
+    segment_ids = assign_segments(price_blind_projection(df_featured, pca_bundle), segment_bundle)
+    n_segments = len(segment_bundle['centroids'])
+    return dummy_block(segment_ids.to_numpy(), 'segment', categories=range(n_segments), drop_first=True,
+                       dtype='int64', index=df_featured.index)
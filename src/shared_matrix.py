@@ -0,0 +1,144 @@
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from config.config import SHARED_MATRIX_DIR, SHARED_MATRIX_CHUNK_ROWS, N_WORKERS
+
+_WORKER_MATRIX = {}
+
+def build_shared_design_matrix(df, features, target='price', log_target=True, output_dir=SHARED_MATRIX_DIR,
+                               dtype=np.float64, add_constant=True):
+    print("Writing shared design matrix")
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    y = pd.to_numeric(df[target], errors='coerce').to_numpy(dtype=float)
+    if log_target:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(y)
+
+    # Row filter is built column by column so the feature frame is never copied
+    valid = np.isfinite(y)
+    for col in features:
+        valid &= df[col].notna().to_numpy()
+    rows = np.flatnonzero(valid)
+
+    # Fold indices cached against the previous matrix stay valid as long as
+    # the same rows and target were written
+    row_index = df.index.to_numpy()[rows]
+    rows_hash = hashlib.sha256(np.ascontiguousarray(row_index).tobytes() +
+                               np.ascontiguousarray(y[rows].astype(dtype)).tobytes()).hexdigest()
+    meta_path = os.path.join(output_dir, 'columns.json')
+    previous_hash = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            previous_hash = json.load(f).get('rows_hash')
+    if previous_hash != rows_hash:
+        for stale_path in glob.glob(os.path.join(output_dir, 'folds_*.npy')):
+            os.remove(stale_path)
+
+    columns = (['const'] if add_constant else []) + list(features)
+    X = np.lib.format.open_memmap(os.path.join(output_dir, 'X.npy'), mode='w+',
+                                  dtype=dtype, shape=(len(rows), len(columns)))
+    offset = 0
+    if add_constant:
+        X[:, 0] = 1.0
+        offset = 1
+    for j, col in enumerate(features):
+        X[:, offset + j] = df[col].to_numpy()[rows].astype(dtype)
+    X.flush()
+    del X
+
+    np.save(os.path.join(output_dir, 'y.npy'), y[rows].astype(dtype))
+    np.save(os.path.join(output_dir, 'row_index.npy'), row_index)
+
+    meta = {
+        'output_dir': output_dir,
+        'columns': columns,
+        'target': target,
+        'log_target': log_target,
+        'shape': [len(rows), len(columns)],
+        'dtype': np.dtype(dtype).name,
+        'rows_hash': rows_hash
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Design matrix {len(rows)} x {len(columns)} ({np.dtype(dtype).name}) written to: {output_dir}")
+    return meta
+
+def load_shared_matrix_meta(output_dir=SHARED_MATRIX_DIR):
+    with open(os.path.join(output_dir, 'columns.json')) as f:
+        return json.load(f)
+
+def attach_design_matrix(meta):
+    output_dir = meta['output_dir']
+    return {
+        'X': np.load(os.path.join(output_dir, 'X.npy'), mmap_mode='r'),
+        'y': np.load(os.path.join(output_dir, 'y.npy'), mmap_mode='r'),
+        'row_index': np.load(os.path.join(output_dir, 'row_index.npy'), mmap_mode='r'),
+        'columns': meta['columns']
+    }
+
+def _attach_worker(meta):
+    _WORKER_MATRIX.clear()
+    _WORKER_MATRIX.update(attach_design_matrix(meta))
+
+def _run_task(func, task):
+    return func(_WORKER_MATRIX, task)
+
+def run_on_shared_matrix(func, tasks, meta, n_workers=N_WORKERS):
+    # func(matrix, task) must be defined at module level so it can be pickled;
+    # workers receive only the metadata and map the files read-only
+    tasks = list(tasks)
+    if n_workers == 1 or len(tasks) <= 1:
+        matrix = attach_design_matrix(meta)
+        return [func(matrix, task) for task in tasks]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_attach_worker, initargs=(meta,)) as executor:
+        return list(executor.map(_run_task, [func] * len(tasks), tasks))
+
+def weighted_normal_equations(X, y, weights=None, chunk_rows=SHARED_MATRIX_CHUNK_ROWS):
+    # Accumulates X'WX and X'Wy in row chunks so a memory-mapped X is streamed, not copied
+    p = X.shape[1]
+    gram = np.zeros((p, p))
+    xty = np.zeros(p)
+    for start in range(0, X.shape[0], chunk_rows):
+        Xc = np.asarray(X[start:start + chunk_rows], dtype=float)
+        yc = np.asarray(y[start:start + chunk_rows], dtype=float)
+        if weights is not None:
+            wc = weights[start:start + chunk_rows]
+            gram += Xc.T @ (Xc * wc[:, None])
+            xty += Xc.T @ (yc * wc)
+        else:
+            gram += Xc.T @ Xc
+            xty += Xc.T @ yc
+    return gram, xty
+
+def fit_ols_shared(matrix, weights=None):
+    gram, xty = weighted_normal_equations(matrix['X'], matrix['y'], weights)
+    return np.linalg.lstsq(gram, xty, rcond=None)[0]
+
+def _bootstrap_ols_task(matrix, seed):
+    # Multinomial resample counts act as weights, equivalent to refitting on a resampled copy
+    n = matrix['X'].shape[0]
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(n, np.full(n, 1.0 / n)).astype(float)
+    return fit_ols_shared(matrix, weights)
+
+def parallel_bootstrap_ols(meta, n_bootstrap=200, n_workers=N_WORKERS, random_state=42):
+    print(f"Bootstrapping OLS coefficients ({n_bootstrap} resamples)")
+    seeds = np.random.SeedSequence(random_state).generate_state(n_bootstrap)
+    coefs = np.vstack(run_on_shared_matrix(_bootstrap_ols_task, seeds, meta, n_workers=n_workers))
+
+    return pd.DataFrame({
+        'feature': meta['columns'],
+        'coefficient_mean': coefs.mean(axis=0),
+        'bootstrap_se': coefs.std(axis=0, ddof=1),
+        'ci_lower': np.percentile(coefs, 2.5, axis=0),
+        'ci_upper': np.percentile(coefs, 97.5, axis=0)
+    })
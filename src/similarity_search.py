@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+from config.config import SIMILARITY_TOP_K, SIMILARITY_QUERY_BATCH_SIZE, SIMILARITY_N_PROBE
+from src.pca_analyzer import project_listings
+from src.lazy_imports import lazy_import
+
+cluster = lazy_import('sklearn.cluster')
+
+FILTER_COLUMNS = ['room_type', 'neighbourhood_cleansed']
+
+def build_similarity_index(principal_df, df=None, approximate=False, n_lists=None, random_state=42):
+    print("Building comparable-listings index")
+
+    vectors = np.ascontiguousarray(principal_df.to_numpy(dtype=np.float32))
+    index = {
+        'vectors': vectors,
+        'sq_norms': np.einsum('ij,ij->i', vectors, vectors),
+        'row_index': principal_df.index,
+        'filters': {}
+    }
+
+    if df is not None:
+        for col in FILTER_COLUMNS:
+            if col in df.columns:
+                codes, labels = pd.factorize(df.loc[principal_df.index, col])
+                index['filters'][col] = (codes, pd.Index(labels))
+
+    if approximate:
+        # Inverted-file layout: coarse k-means cells, each holding its member rows
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        kmeans = cluster.MiniBatchKMeans(n_clusters=n_lists, random_state=random_state, n_init=3,
+                                         batch_size=min(len(vectors), 10 * n_lists + 1024))
+        assignments = kmeans.fit_predict(vectors)
+        order = np.argsort(assignments, kind='stable')
+        index['centroids'] = kmeans.cluster_centers_.astype(np.float32)
+        index['list_members'] = order
+        index['list_indptr'] = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+        print(f"Approximate mode: {n_lists} lists")
+
+    print(f"Indexed {len(vectors)} listings in {vectors.shape[1]}-dimensional PC space")
+    return index
+
+def _candidate_mask(index, room_type=None, neighbourhood=None):
+    mask = np.ones(len(index['vectors']), dtype=bool)
+    for col, wanted in [('room_type', room_type), ('neighbourhood_cleansed', neighbourhood)]:
+        if wanted is None:
+            continue
+        if col not in index['filters']:
+            raise ValueError(f"Index was built without '{col}' - pass df to build_similarity_index")
+        codes, labels = index['filters'][col]
+        wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+        mask &= np.isin(codes, labels.get_indexer(wanted))
+    return mask
+
+def _merge_top_k(best_d, best_i, d, i, k):
+    all_d = np.concatenate([best_d, d], axis=1)
+    all_i = np.concatenate([best_i, i], axis=1)
+    keep = np.argpartition(all_d, k - 1, axis=1)[:, :k] if all_d.shape[1] > k else np.argsort(all_d, axis=1)
+    return np.take_along_axis(all_d, keep, axis=1), np.take_along_axis(all_i, keep, axis=1)
+
+def _exact_search(index, queries, k, candidates, exclude, batch_size):
+    vectors = index['vectors'][candidates]
+    sq_norms = index['sq_norms'][candidates]
+    k_eff = min(k, len(candidates))
+
+    out_d = np.empty((len(queries), k_eff), dtype=np.float32)
+    out_i = np.empty((len(queries), k_eff), dtype=np.int64)
+
+    for start in range(0, len(queries), batch_size):
+        q = queries[start:start + batch_size]
+        # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2, one matrix product per batch
+        d = np.einsum('ij,ij->i', q, q)[:, None] - 2 * q @ vectors.T + sq_norms[None, :]
+        if exclude is not None:
+            excluded = exclude[start:start + batch_size]
+            local = np.searchsorted(candidates, excluded).clip(max=len(candidates) - 1)
+            hit = candidates[local] == excluded
+            d[np.flatnonzero(hit), local[hit]] = np.inf
+        if k_eff == 0:
+            continue
+        # Select straight from the batch's distances; only k_eff columns per query are gathered
+        keep = np.argpartition(d, k_eff - 1, axis=1)[:, :k_eff]
+        out_d[start:start + len(q)] = np.take_along_axis(d, keep, axis=1)
+        out_i[start:start + len(q)] = candidates[keep]
+
+    return out_d, out_i
+
+def _approximate_search(index, queries, k, candidate_mask, exclude, n_probe):
+    centroids = index['centroids']
+    n_probe = min(n_probe, len(centroids))
+    centroid_d = (np.einsum('ij,ij->i', queries, queries)[:, None] - 2 * queries @ centroids.T +
+                  np.einsum('ij,ij->i', centroids, centroids)[None, :])
+    probes = np.argpartition(centroid_d, n_probe - 1, axis=1)[:, :n_probe]
+
+    best_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+    best_i = np.full((len(queries), k), -1, dtype=np.int64)
+
+    # Invert the probe table so each list is visited once and scored against
+    # every query that probes it in a single matrix product
+    probe_lists = probes.ravel()
+    probe_order = np.argsort(probe_lists, kind='stable')
+    probe_queries = (probe_order // n_probe)
+    list_ids, list_starts = np.unique(probe_lists[probe_order], return_index=True)
+    list_stops = np.append(list_starts[1:], len(probe_order))
+
+    for list_id, q_start, q_stop in zip(list_ids, list_starts, list_stops):
+        members = index['list_members'][index['list_indptr'][list_id]:index['list_indptr'][list_id + 1]]
+        members = members[candidate_mask[members]]
+        if len(members) == 0:
+            continue
+        q_rows = probe_queries[q_start:q_stop]
+        q = queries[q_rows]
+        d = (np.einsum('ij,ij->i', q, q)[:, None] - 2 * q @ index['vectors'][members].T +
+             index['sq_norms'][members][None, :])
+        if exclude is not None:
+            d[exclude[q_rows, None] == members[None, :]] = np.inf
+        best_d[q_rows], best_i[q_rows] = _merge_top_k(best_d[q_rows], best_i[q_rows], d,
+                                                      np.broadcast_to(members, d.shape), k)
+    return best_d, best_i
+
+def find_similar_listings(index, queries, k=SIMILARITY_TOP_K, room_type=None, neighbourhood=None,
+                          approximate=None, n_probe=SIMILARITY_N_PROBE, batch_size=SIMILARITY_QUERY_BATCH_SIZE,
+                          exclude_positions=None):
+    queries = np.ascontiguousarray(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+    candidate_mask = _candidate_mask(index, room_type, neighbourhood)
+    if approximate is None:
+        approximate = 'centroids' in index
+    if approximate and 'centroids' not in index:
+        raise ValueError("Index was built without approximate=True")
+
+    if approximate:
+        distances, positions = _approximate_search(index, queries, k, candidate_mask, exclude_positions, n_probe)
+    else:
+        distances, positions = _exact_search(index, queries, k, np.flatnonzero(candidate_mask),
+                                             exclude_positions, batch_size)
+
+    order = np.argsort(distances, axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    positions = np.take_along_axis(positions, order, axis=1)
+
+    found = np.isfinite(distances) & (positions >= 0)
+    query_ids, ranks = np.nonzero(found)
+    return pd.DataFrame({
+        'query': query_ids,
+        'rank': ranks + 1,
+        'listing_index': index['row_index'][positions[found]],
+        'distance': np.sqrt(np.clip(distances[found], 0, None))
+    })
+
+def similar_to_listings(index, listing_index, k=SIMILARITY_TOP_K, **kwargs):
+    positions = index['row_index'].get_indexer(listing_index)
+    if (positions < 0).any():
+        raise KeyError("Some listings are not in the similarity index")
+    results = find_similar_listings(index, index['vectors'][positions], k=k,
+                                    exclude_positions=positions, **kwargs)
+    results['query'] = np.asarray(listing_index)[results['query'].to_numpy()]
+    return results
+
+def similar_to_new_listings(index, new_df, pca_bundle, k=SIMILARITY_TOP_K, **kwargs):
+    projected = project_listings(new_df, pca_bundle)
+    results = find_similar_listings(index, projected.to_numpy(), k=k, **kwargs)
+    results['query'] = new_df.index[results['query'].to_numpy()]
+    return results
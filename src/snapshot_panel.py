@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from config.config import SNAPSHOT_PATHS, PANEL_MOMENTUM_WINDOW
+
+PANEL_COLUMNS = ['price', 'calculated_host_listings_count']
+
+def _read_column(path, column):
+    # Only the id and one value column of a snapshot are ever in memory
+    data = pd.read_csv(path, usecols=['id', column])
+    values = data[column]
+    if not pd.api.types.is_numeric_dtype(values):
+        # Raw snapshots keep prices as '$1,234.00'
+        values = pd.to_numeric(values.astype(str).str.replace('[\\$,]', '', regex=True), errors='coerce')
+    return data['id'].to_numpy(dtype=np.int64), values.to_numpy(dtype=np.float32)
+
+def build_snapshot_panel(snapshots=SNAPSHOT_PATHS, columns=PANEL_COLUMNS):
+    """
+    Align listings snapshots by listing id. snapshots: (date, path) pairs.
+    Every snapshot's ids are sorted once, and each column is placed into an
+    (ids x snapshots) float32 matrix by a merge of sorted ids; columns are
+    read one at a time, so memory is one matrix per column plus the id index
+    """
+    snapshots = sorted((pd.Timestamp(date), path) for date, path in snapshots)
+    print(f"Building snapshot panel from {len(snapshots)} snapshots")
+
+    # Pass 1: sorted id arrays, and their union as the panel's row index
+    sorted_ids = []
+    for date, path in snapshots:
+        ids = np.unique(pd.read_csv(path, usecols=['id'])['id'].to_numpy(dtype=np.int64))
+        sorted_ids.append(ids)
+        print(f"   {date.date()}: {len(ids)} listings")
+    panel_ids = np.unique(np.concatenate(sorted_ids))
+
+    presence = np.zeros((len(panel_ids), len(snapshots)), dtype=bool)
+    for t, ids in enumerate(sorted_ids):
+        presence[np.searchsorted(panel_ids, ids), t] = True
+
+    # Pass 2: one column at a time, every snapshot merged into its matrix
+    values = {}
+    for column in columns:
+        matrix = np.full((len(panel_ids), len(snapshots)), np.nan, dtype=np.float32)
+        for t, (date, path) in enumerate(snapshots):
+            ids, column_values = _read_column(path, column)
+            order = np.argsort(ids, kind='stable')
+            matrix[np.searchsorted(panel_ids, ids[order]), t] = column_values[order]
+        values[column] = matrix
+
+    print(f"Panel: {len(panel_ids)} listings x {len(snapshots)} snapshots")
+    return {
+        'ids': pd.Index(panel_ids, name='id'),
+        'dates': pd.DatetimeIndex([date for date, _ in snapshots]),
+        'paths': [path for _, path in snapshots],
+        'presence': presence,
+        'values': values
+    }
+
+def price_change_series(panel):
+    # Log price change between consecutive snapshots; NaN where either side is missing
+    log_price = np.log(np.where(panel['values']['price'] > 0, panel['values']['price'], np.nan))
+    return pd.DataFrame(np.diff(log_price, axis=1), index=panel['ids'], columns=panel['dates'][1:])
+
+def entry_exit(panel):
+    """
+    Per listing: first and last snapshot seen, snapshots present, and whether
+    it entered in or exited before the latest snapshot
+    """
+    presence = panel['presence']
+    n_snapshots = presence.shape[1]
+    first = presence.argmax(axis=1)
+    last = n_snapshots - 1 - presence[:, ::-1].argmax(axis=1)
+    return pd.DataFrame({
+        'first_seen': panel['dates'][first],
+        'last_seen': panel['dates'][last],
+        'snapshots_present': presence.sum(axis=1),
+        'entered_latest': first == n_snapshots - 1,
+        'exited': last < n_snapshots - 1
+    }, index=panel['ids'])
+
+def survival_curve(panel):
+    """
+    Share of listings still listed k snapshots after they first appeared,
+    counting only listings whose first appearance is at least k snapshots
+    before the latest (Kaplan-Meier without re-entry)
+    """
+    presence = panel['presence']
+    n_snapshots = presence.shape[1]
+    first = presence.argmax(axis=1)
+    # A listing survives to k while it is present in every snapshot since entry
+    gaps = np.cumsum(~presence, axis=1)
+    rows = []
+    for k in range(n_snapshots):
+        at_risk = first + k < n_snapshots
+        if not at_risk.any():
+            break
+        idx = np.nonzero(at_risk)[0]
+        alive = gaps[idx, first[idx] + k] == gaps[idx, first[idx]]
+        rows.append({'snapshots_since_entry': k, 'at_risk': len(idx), 'surviving': alive.mean()})
+    return pd.DataFrame(rows)
+
+def host_portfolio_growth(panel, target=-1, window=PANEL_MOMENTUM_WINDOW):
+    # Change in the host's listing count over the `window` snapshots up to
+    # target, as seen from each listing's own rows. A listing that appears
+    # within the window is measured from its first count there; one with no
+    # earlier count in the window gets NaN
+    counts = panel['values']['calculated_host_listings_count']
+    target = target % counts.shape[1]
+    start = max(target - window, 0)
+    growth = np.full(len(counts), np.nan)
+    if target > start:
+        history = counts[:, start:target]
+        observed = ~np.isnan(history)
+        first = history[np.arange(len(counts)), observed.argmax(axis=1)]
+        growth = np.where(observed.any(axis=1), counts[:, target] - first, np.nan)
+    return pd.Series(growth, index=panel['ids'], name='host_portfolio_growth')
+
+def panel_features(panel, target=-1, window=PANEL_MOMENTUM_WINDOW):
+    """
+    Listing features for the hedonic models, as of the target snapshot.
+    Price features use only snapshots before the target, so none of them
+    contains the price being modelled. Listings without a price history get
+    zeros and has_price_history = 0, so the models keep them; the same goes
+    for host portfolio growth and has_host_history
+    """
+    n_snapshots = len(panel['dates'])
+    target = target % n_snapshots
+    changes = price_change_series(panel).to_numpy()[:, :max(target - 1, 0)]
+    observed = ~np.isnan(changes)
+    n_observed = observed.sum(axis=1)
+    filled = np.where(observed, changes, 0.0)
+
+    recent, recent_n = filled[:, -window:], observed[:, -window:].sum(axis=1)
+    mean_change = filled.sum(axis=1) / np.maximum(n_observed, 1)
+    presence = panel['presence'][:, :target + 1]
+    host_growth = host_portfolio_growth(panel, target, window)
+
+    features = pd.DataFrame({
+        'has_price_history': (n_observed > 0).astype('int64'),
+        'price_change_last': filled[:, -1] if changes.shape[1] else 0.0,
+        'price_momentum': recent.sum(axis=1) / np.maximum(recent_n, 1),
+        'price_volatility': np.sqrt((np.where(observed, changes - mean_change[:, None], 0.0) ** 2).sum(axis=1)
+                                    / np.maximum(n_observed, 1)),
+        'tenure_snapshots': target - presence.argmax(axis=1),
+        'snapshots_present': presence.sum(axis=1),
+        'has_host_history': host_growth.notna().astype('int64').to_numpy(),
+        'host_portfolio_growth': host_growth.fillna(0).to_numpy()
+    }, index=panel['ids'])
+    # Listings absent from the target snapshot are not modelled
+    return features[panel['presence'][:, target]]
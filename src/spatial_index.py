@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+from config.config import SPATIAL_K_NEIGHBORS, SPATIAL_RADIUS_KM, SPATIAL_QUERY_BATCH_SIZE
+from src.lazy_imports import lazy_import
+
+neighbors = lazy_import('sklearn.neighbors')
+
+EARTH_RADIUS_KM = 6371.0088
+
+def build_spatial_index(df, lat_col='latitude', lon_col='longitude'):
+    print("Building spatial index")
+
+    lat = pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+
+    coords_rad = np.radians(np.column_stack([lat[valid], lon[valid]]))
+    # An empty index has no tree; compute_spatial_features then returns NaN features
+    tree = neighbors.BallTree(coords_rad, metric='haversine') if valid.any() else None
+
+    print(f"Indexed {valid.sum()} listings with coordinates")
+    return {
+        'tree': tree,
+        'coords_rad': coords_rad,
+        'positions': np.flatnonzero(valid),
+        'valid': valid
+    }
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def compute_spatial_features(df, spatial_index, k=SPATIAL_K_NEIGHBORS, radius_km=SPATIAL_RADIUS_KM,
+                             batch_size=SPATIAL_QUERY_BATCH_SIZE, price_col='price',
+                             neighbourhood_col='neighbourhood_cleansed'):
+    print("Computing spatial neighbour features")
+
+    tree = spatial_index['tree']
+    coords_rad = spatial_index['coords_rad']
+    positions = spatial_index['positions']
+    n_indexed = len(positions)
+    density_col = f'listing_density_{radius_km:g}km'
+    if n_indexed < 2:
+        # No listing has a neighbour to compare against
+        print(f"Only {n_indexed} listings with coordinates - spatial features left empty")
+        return pd.DataFrame(np.nan, index=df.index,
+                            columns=[f'knn{k}_median_log_price', density_col, 'dist_to_neighbourhood_centroid_km'])
+    # Small inputs query fewer neighbours, but the column keeps the configured k
+    k_query = min(k, n_indexed - 1)
+
+    price = pd.to_numeric(df[price_col], errors='coerce').to_numpy(dtype=float)[positions]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_price = np.where(price > 0, np.log(price), np.nan)
+
+    knn_median = np.full(n_indexed, np.nan)
+    density = np.zeros(n_indexed)
+    radius_rad = radius_km / EARTH_RADIUS_KM
+
+    for start in range(0, n_indexed, batch_size):
+        stop = min(start + batch_size, n_indexed)
+        batch = coords_rad[start:stop]
+        rows = np.arange(start, stop)
+
+        # Ask for k+1 so the listing itself can be dropped from its own neighbourhood
+        _, ind = tree.query(batch, k=k_query + 1)
+        self_mask = ind == rows[:, None]
+        self_mask[~self_mask.any(axis=1), -1] = True
+        neighbour_prices = log_price[ind]
+        neighbour_prices[self_mask] = np.nan
+        with np.errstate(all='ignore'):
+            knn_median[start:stop] = np.nanmedian(neighbour_prices, axis=1)
+
+        density[start:stop] = tree.query_radius(batch, r=radius_rad, count_only=True) - 1
+
+    spatial_df = pd.DataFrame(np.nan, index=df.index,
+                              columns=[f'knn{k}_median_log_price', density_col, 'dist_to_neighbourhood_centroid_km'])
+    spatial_df.iloc[positions, 0] = knn_median
+    spatial_df.iloc[positions, 1] = density
+
+    if neighbourhood_col in df.columns:
+        lat, lon = np.degrees(coords_rad[:, 0]), np.degrees(coords_rad[:, 1])
+        nb_codes, _ = pd.factorize(df[neighbourhood_col].to_numpy()[positions])
+        has_nb = nb_codes >= 0
+        n_nb = nb_codes.max() + 1 if has_nb.any() else 0
+        nb_counts = np.bincount(nb_codes[has_nb], minlength=n_nb)
+        centroid_lat = np.bincount(nb_codes[has_nb], weights=lat[has_nb], minlength=n_nb) / nb_counts
+        centroid_lon = np.bincount(nb_codes[has_nb], weights=lon[has_nb], minlength=n_nb) / nb_counts
+
+        dist = np.full(n_indexed, np.nan)
+        dist[has_nb] = haversine_km(lat[has_nb], lon[has_nb],
+                                    centroid_lat[nb_codes[has_nb]], centroid_lon[nb_codes[has_nb]])
+        spatial_df.iloc[positions, 2] = dist
+
+    print(f"Computed spatial features for {n_indexed} listings (k={k_query}, r={radius_km:g}km)")
+    return spatial_df
+
+def add_spatial_features(df, k=SPATIAL_K_NEIGHBORS, radius_km=SPATIAL_RADIUS_KM):
+    spatial_index = build_spatial_index(df)
+    spatial_df = compute_spatial_features(df, spatial_index, k=k, radius_km=radius_km)
+    for col in spatial_df.columns:
+        df[col] = spatial_df[col]
+    return df
@@ -0,0 +1,90 @@
+import os
+import importlib.util
+import pandas as pd
+from src.lazy_imports import lazy_import
+
+duckdb = lazy_import('duckdb')
+
+def sql_backend_available():
+    return importlib.util.find_spec('duckdb') is not None
+
+def parquet_cache(csv_path, parquet_path=None):
+    """
+    Columnar copy of a processed CSV, written by DuckDB itself (no pandas
+    round trip) and rebuilt whenever the CSV is newer than the copy
+    """
+    parquet_path = parquet_path or os.path.splitext(csv_path)[0] + '.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        return parquet_path
+
+    print(f"Caching {csv_path} as Parquet: {parquet_path}")
+    conn = duckdb.connect()
+    conn.execute(f"COPY (SELECT * FROM read_csv({_quote(csv_path)}, header = true)) "
+                 f"TO {_quote(parquet_path + '.tmp')} (FORMAT parquet)")
+    conn.close()
+    os.replace(parquet_path + '.tmp', parquet_path)
+    return parquet_path
+
+def _quote(path):
+    # COPY does not take prepared parameters, so paths are inlined as literals
+    return "'" + str(path).replace("'", "''") + "'"
+
+def _query(source, sql, params=None):
+    # Every query reads the Parquet file directly; only the result is materialised
+    conn = duckdb.connect()
+    conn.execute(f"CREATE VIEW listings AS SELECT * FROM read_parquet({_quote(source)}, file_row_number = true)")
+    result = conn.execute(sql, params or []).df()
+    conn.close()
+    return result
+
+def top_values(source, column, n=10):
+    # value_counts().head(n).index, which skips missing values; ties go to the
+    # value seen first in the file
+    result = _query(source, f'SELECT "{column}" AS value FROM listings WHERE "{column}" IS NOT NULL GROUP BY 1 '
+                            f'ORDER BY count(*) DESC, min(file_row_number) LIMIT ?', [n])
+    return pd.Index(result['value'], name=column)
+
+def host_behavior_aggregates(source, top_n=10):
+    """
+    The groupbys of analyze_host_behavior, in the same shapes and with the
+    same missing-value handling: neighborhood_host_counts, pricing_comparison
+    and the top-n neighborhoods by listing count. They only save memory when
+    the listings are not otherwise loaded; analyze_host_behavior still needs
+    the frame for its other analyses
+    """
+    neighborhood_host_counts = _query(source, """
+        SELECT neighbourhood_cleansed,
+               count(DISTINCT host_id) AS host_id,
+               sum(calculated_host_listings_count) AS calculated_host_listings_count,
+               avg(price) AS price
+        FROM listings
+        WHERE neighbourhood_cleansed IS NOT NULL
+        GROUP BY neighbourhood_cleansed
+        ORDER BY neighbourhood_cleansed
+    """)
+    neighborhood_host_counts['listings_per_host'] = (
+        neighborhood_host_counts['calculated_host_listings_count'] /
+        neighborhood_host_counts['host_id']
+    )
+
+    comparison = _query(source, """
+        SELECT coalesce(calculated_host_listings_count > 1, false) AS is_multi_lister,
+               avg(price) AS price_mean,
+               median(price) AS price_median,
+               count(price) AS price_count,
+               avg(review_scores_rating) AS review_scores_rating_mean,
+               avg(availability_30) AS availability_30_mean
+        FROM listings
+        GROUP BY 1
+        ORDER BY 1
+    """).set_index('is_multi_lister')
+    comparison.columns = pd.MultiIndex.from_tuples([
+        ('price', 'mean'), ('price', 'median'), ('price', 'count'),
+        ('review_scores_rating', 'mean'), ('availability_30', 'mean')
+    ])
+
+    return {
+        'neighborhood_host_counts': neighborhood_host_counts,
+        'pricing_comparison': comparison.round(2),
+        'top_neighborhoods': top_values(source, 'neighbourhood_cleansed', top_n)
+    }
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from config.config import TEXT_COLUMNS, TEXT_HASH_FEATURES, TEXT_CHUNK_ROWS
+from src.lazy_imports import lazy_import
+
+sparse = lazy_import('scipy.sparse')
+sklearn_text = lazy_import('sklearn.feature_extraction.text')
+linear_model = lazy_import('sklearn.linear_model')
+model_selection = lazy_import('sklearn.model_selection')
+metrics = lazy_import('sklearn.metrics')
+preprocessing = lazy_import('sklearn.preprocessing')
+
+def make_text_vectorizer(n_features=TEXT_HASH_FEATURES):
+    # Stateless: the same text always hashes to the same columns, no vocabulary is fitted
+    return sklearn_text.HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False,
+                             norm='l2', dtype=np.float32)
+
+def _combine_text(chunk, text_columns):
+    available = [col for col in text_columns if col in chunk.columns]
+    if not available:
+        return pd.Series('', index=chunk.index)
+    text = chunk[available[0]].fillna('').astype(str)
+    for col in available[1:]:
+        text = text + ' ' + chunk[col].fillna('').astype(str)
+    return text
+
+def hash_text_chunks(chunks, text_columns=TEXT_COLUMNS, n_features=TEXT_HASH_FEATURES):
+    vectorizer = make_text_vectorizer(n_features)
+    blocks = []
+    n_docs = 0
+    for chunk in chunks:
+        blocks.append(vectorizer.transform(_combine_text(chunk, text_columns)))
+        n_docs += len(chunk)
+    print(f"Hashed {n_docs} documents into {n_features} text features")
+    if not blocks:
+        return sparse.csr_matrix((0, n_features), dtype=np.float32)
+    return sparse.vstack(blocks, format='csr')
+
+def hash_text_features(df, text_columns=TEXT_COLUMNS, n_features=TEXT_HASH_FEATURES, chunk_rows=TEXT_CHUNK_ROWS):
+    print("Hashing listing text")
+    chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    return hash_text_chunks(chunks, text_columns, n_features)
+
+def hash_text_file(file_path, output_path=None, text_columns=TEXT_COLUMNS, n_features=TEXT_HASH_FEATURES,
+                   chunk_rows=TEXT_CHUNK_ROWS):
+    print("Hashing listing text from file")
+    header = pd.read_csv(file_path, nrows=0).columns
+    usecols = [col for col in text_columns if col in header]
+    reader = pd.read_csv(file_path, usecols=usecols, dtype=str, chunksize=chunk_rows)
+    text_matrix = hash_text_chunks(reader, text_columns, n_features)
+    if output_path is not None:
+        sparse.save_npz(output_path, text_matrix)
+        print(f"Text features saved to: {output_path}")
+    return text_matrix
+
+def fit_text_price_model(X_dense, y, text_matrix, alpha=1.0, test_size=0.2, random_state=42):
+    print("Fitting sparse text + structured price model")
+
+    X_dense = np.asarray(X_dense, dtype=float)
+    y = np.asarray(y, dtype=float)
+    rows = np.arange(len(y))
+    train_rows, test_rows = model_selection.train_test_split(rows, test_size=test_size, random_state=random_state)
+
+    # Scaled on the training rows only, and the same block goes into both
+    # models, so the lift measures the text and nothing else
+    scaler = preprocessing.StandardScaler().fit(X_dense[train_rows])
+    dense_block = sparse.csr_matrix(scaler.transform(X_dense))
+    X_combined = sparse.hstack([dense_block, text_matrix], format='csr')
+
+    base_model = linear_model.Ridge(alpha=alpha, solver='sparse_cg').fit(dense_block[train_rows], y[train_rows])
+    base_r2 = metrics.r2_score(y[test_rows], base_model.predict(dense_block[test_rows]))
+
+    text_model = linear_model.Ridge(alpha=alpha, solver='sparse_cg').fit(X_combined[train_rows], y[train_rows])
+    text_r2 = metrics.r2_score(y[test_rows], text_model.predict(X_combined[test_rows]))
+
+    print(f"Holdout R-squared without text: {base_r2:.3f}")
+    print(f"Holdout R-squared with text: {text_r2:.3f} (lift {text_r2 - base_r2:+.3f})")
+    return {
+        'text_model': text_model,
+        'holdout_r2_base': base_r2,
+        'holdout_r2_text': text_r2,
+        'r2_lift': text_r2 - base_r2
+    }
@@ -1,11 +1,11 @@
 import os
-from config.config import OUTPUT_PATH, PCA_COMPONENTS_PATH, OUTPUT_PATH2, OUTPUT_PATH3
+from config.config import PROCESSED_DIR, OUTPUT_PATH, PCA_COMPONENTS_PATH, OUTPUT_PATH2, OUTPUT_PATH3
 
 def save_results(cleaned_df, principal_df):
     print(" Saving results")
     
 
-    os.makedirs('Dataset Processed', exist_ok=True)
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
     
     cleaned_df.to_csv(OUTPUT_PATH, index=False)
     principal_df.to_csv(PCA_COMPONENTS_PATH)